@@ -4,7 +4,7 @@ import os
 import operator
 from dotenv import load_dotenv
 from pathlib import Path
-from typing import Any, TypedDict, Annotated, List
+from typing import Any, Dict, Tuple, TypedDict, Annotated, List
 
 from langchain_core.messages import AIMessage, HumanMessage,SystemMessage, RemoveMessage
 from langchain_core.runnables import RunnableConfig
@@ -19,6 +19,14 @@ from pydantic import BaseModel, Field
 from langchain_tavily import TavilySearch
 from langchain_community.document_loaders import WikipediaLoader
 
+import metrics
+from interview_context import merge_context, select_context
+from llm_cache import create_llm_cache
+from prompt_registry import PromptRegistry, find_prompt_dir
+from resource_budget import LLM_RESOURCES, SEARCH_RESOURCES, budget_exceeded, budget_from_config
+from search_cache import create_search_cache
+from structured_output import structured_output
+
 
 # for tracing purpose
 import mlflow
@@ -40,12 +48,58 @@ _set_env("TAVILY_API_KEY")
 
 # LLM
 model = ChatGoogleGenerativeAI(model="gemini-2.5-flash")
+
+# responses shared by the sessions of a batch when LLM_CACHE enables it (off by default):
+# batch runs use a copy of the model that answers identical prompts from this cache, while
+# other sessions always get a fresh generation
+llm_cache = create_llm_cache()
+_cached_models: Dict[int, Tuple[Any, Any]] = {}
 tavily_search  = TavilySearch(max_results=3)
 
+# search results shared by every interview in the process (or, with SEARCH_CACHE=sqlite, by
+# every process), so analysts and sessions on related topics do not repeat the same searches
+search_cache = create_search_cache()
+
+def shared_cache_model(base: Any = None) -> Any:
+    """base (default: model) answering identical prompts from the shared LLM cache, if there is one"""
+    base = model if base is None else base
+    if llm_cache is None:
+        return base
+    entry = _cached_models.get(id(base))
+    # The base model is kept in the entry, so its id cannot be reused meanwhile
+    if entry is None or entry[0] is not base:
+        entry = _cached_models[id(base)] = (base, base.model_copy(update={"cache": llm_cache}))
+    return entry[1]
+
+def chat_model(config: RunnableConfig = None) -> Any:
+    """The model for a run: the shared-cache copy for runs of batch sessions (configurable "shared_llm_cache")"""
+    if ((config or {}).get("configurable") or {}).get("shared_llm_cache"):
+        return shared_cache_model()
+    return model
+
+def cached_search(source: str, query: str, search, config: RunnableConfig = None):
+    """
+    Run a search through the shared cache, timing the requests that reach the backend.
+    Only those are charged to the run's budget; cache hits are free.
+    """
+    metrics.search_requests.inc(source=source)
+    budget = budget_from_config(config)
+    def timed_search():
+        if budget is not None:
+            budget.record_search()
+        with metrics.search_duration.time(source=source):
+            return search()
+    return search_cache.get_or_search(source, query, timed_search)
+
+
+# Templates of the nearest 'prompt' folder, loaded once and reloaded when the files change
+# (checked at most every PROMPT_RELOAD_SECONDS; -1 disables reloading)
+prompts = PromptRegistry(find_prompt_dir(Path(__file__).resolve().parent),
+                         check_interval=float(os.getenv("PROMPT_RELOAD_SECONDS", "2")))
 
 def read_prompt_file(filename: str) -> str:
     """
-    Reads a .md file from the nearest 'prompt' folder by walking up directories.
+    Returns the text of a prompt template from the nearest 'prompt' folder.
 
     Args:
         filename (str): The name of the markdown file (with or without .md extension).
@@ -53,20 +107,7 @@ def read_prompt_file(filename: str) -> str:
     Returns:
         str: The content of the markdown file.
     """
-    if not filename.endswith(".md"):
-        filename += ".md"
-
-    # Start from current file's directory
-    current_dir = Path(__file__).resolve().parent
-
-    # Walk upwards until we find a 'prompt' folder
-    for parent in [current_dir, *current_dir.parents]:
-        prompt_dir = parent / "prompt"
-        file_path = prompt_dir / filename
-        if file_path.exists():
-            return file_path.read_text(encoding="utf-8")
-
-    raise FileNotFoundError(f"No 'prompt' folder found upwards from {current_dir}, file: {filename}")
+    return prompts.get(filename).text
 
 
 # Our goal is to build a lightweight, multi-agent system around chat models that customizes the research process.
@@ -127,6 +168,14 @@ class GenerateAnalystsState(TypedDict):
     analysts: List[Analyst] # List of analyst who are going to ask questions to expert
 
 
+def analyst_messages(topic: str, max_analysts: int, human_analyst_feedback: str = ""):
+    """Prompt messages asking the model for the analysts of a topic"""
+    # system message
+    system_message = prompts.format("analyst_instructions", topic=topic,
+                                    human_analyst_feedback=human_analyst_feedback,
+                                    max_analysts=max_analysts)
+    return [SystemMessage(content=system_message)]+[HumanMessage(content="Generate the set of analysts.")]
+
 # build the graph node to create the analyst
 def create_analysts(state: GenerateAnalystsState):
     """ Create analyst based on the topic and human feedback"""
@@ -135,18 +184,28 @@ def create_analysts(state: GenerateAnalystsState):
     human_analyst_feedback = state.get("human_analyst_feedback", "")
 
     # enforce structured output
-    structured_llm = model.with_structured_output(Perspectives)
+    structured_llm = structured_output(model, Perspectives)
 
-    # system message
-    system_message = read_prompt_file("analyst_instructions").format(topic=topic,
-                                                                      human_analyst_feedback=human_analyst_feedback,
-                                                                      max_analysts=max_analysts
-                                                                    )
     # generate analysts
-    analysts = structured_llm.invoke([SystemMessage(content=system_message)]+[HumanMessage(content="Generate the set of analysts.")])
+    analysts = structured_llm.invoke(analyst_messages(topic, max_analysts, human_analyst_feedback))
 
     return {"analysts": analysts.analysts}
 
+def create_analysts_batch(topics: List[str], max_analysts: int, max_concurrency: int = 4,
+                          config: RunnableConfig = None) -> List[Any]:
+    """
+    Generate the analysts of many topics with one batched model call.
+
+    Returns one entry per topic: its list of analysts, or the exception raised for it.
+    """
+    structured_llm = structured_output(shared_cache_model(), Perspectives)
+    results = structured_llm.batch(
+        [analyst_messages(topic, max_analysts) for topic in topics],
+        config={**(config or {}), "max_concurrency": max_concurrency},
+        return_exceptions=True
+    )
+    return [result if isinstance(result, Exception) else result.analysts for result in results]
+
 def human_feedback(state: GenerateAnalystsState):
     """no-op node that should be interuppted on"""
     pass
@@ -239,25 +298,31 @@ def should_continue(state: GenerateAnalystsState):
 # Conduct Interview
 # Generate Question
 ###################################################
+# Token budget of the source documents put into each answer and section prompt (0: no limit)
+INTERVIEW_CONTEXT_MAX_TOKENS = int(os.getenv("INTERVIEW_CONTEXT_MAX_TOKENS", "6000"))
+
 class InterviewState(MessagesState):
     max_num_turns: int # max numer of turns for conversation
-    context: Annotated[list, operator.add] # source documents
+    context: Annotated[list, merge_context] # source documents, each kept once
     analyst: Analyst # Analyst who is going to ask question to expert
     interview: str # interview transcript between analyst and expert
-    section: list # final key we duplicate in outer state for Send() API
+    sections: list # final key we duplicate in outer state for Send() API
+    search_query: str # query for the latest question, shared by every retriever
 
 # build the graph node to generate the question related to topic
-def generate_question(state: InterviewState):
+def generate_question(state: InterviewState, config: RunnableConfig = None):
     """Node to generate a question by analyst"""
+    # Out of budget: ask nothing more, the interview ends after this turn
+    if budget_exceeded(config, *LLM_RESOURCES):
+        return {}
+
     # get state
     analyst = state["analyst"]
     messages = state["messages"]
 
     # generate question
-    system_message = read_prompt_file("question_instructions").format(
-        goals=analyst.persona
-    )
-    question = model.invoke([SystemMessage(content=system_message)] + messages)
+    system_message = prompts.format("question_instructions", goals=analyst.persona)
+    question = chat_model(config).invoke([SystemMessage(content=system_message)] + messages)
 
     # write question to state
     return {"messages": [question]}
@@ -271,17 +336,39 @@ def generate_question(state: InterviewState):
 class SearchQuery(BaseModel):
     search_query: str = Field(None, description="Search Query for retrieval.")
 
-# node to search the relevant doc from web
-def search_web(state: InterviewState):
-    """ Retrieve docs from web search """
+# node to turn the latest question into one search query for all retrievers
+def generate_search_query(state: InterviewState, config: RunnableConfig = None):
+    """ Generate the search query of the current turn """
+    if budget_exceeded(config, *SEARCH_RESOURCES):
+        return {"search_query": ""}
 
     search_instructions = read_prompt_file("search_instructions")
-    # Search query
-    structured_llm = model.with_structured_output(SearchQuery)
+    structured_llm = structured_output(chat_model(config), SearchQuery)
     search_query = structured_llm.invoke([search_instructions] + state['messages'])
     print(search_query.search_query)
+    return {"search_query": search_query.search_query or ""}
+
+def current_search_query(state: InterviewState, config: RunnableConfig = None) -> str:
+    """ The turn's shared search query (generated here for checkpoints saved before it existed) """
+    if "search_query" in state:
+        return state["search_query"]
+    return generate_search_query(state, config)["search_query"]
+
+# node to search the relevant doc from web
+def search_web(state: InterviewState, config: RunnableConfig = None):
+    """ Retrieve docs from web search """
+    if budget_exceeded(config, *SEARCH_RESOURCES):
+        return {"context": []}
+    search_query = current_search_query(state, config)
+    if not search_query:
+        return {"context": []}
+
     # Search
-    search_docs = tavily_search.invoke({"query":search_query.search_query})
+    search_docs = cached_search(
+        "tavily", search_query,
+        lambda: tavily_search.invoke({"query":search_query}),
+        config
+    )
      # Format
     formatted_search_docs = "\n\n---\n\n".join(
         [
@@ -293,17 +380,21 @@ def search_web(state: InterviewState):
     return {"context": [formatted_search_docs]} 
 
 # node to search the relevant document from wikipedia
-def search_wikipedia(state: InterviewState):
+def search_wikipedia(state: InterviewState, config: RunnableConfig = None):
     """ Retrieve docs from wikipedia """
-
-    search_instructions = read_prompt_file("search_instructions")
-    # Search query
-    structured_llm = model.with_structured_output(SearchQuery)
-    search_query = structured_llm.invoke([search_instructions] + state['messages'])
+    if budget_exceeded(config, *SEARCH_RESOURCES):
+        return {"context": []}
+    search_query = current_search_query(state, config)
+    if not search_query:
+        return {"context": []}
     
     # Search
-    search_docs = WikipediaLoader(query=search_query.search_query, 
-                                  load_max_docs=2).load()
+    search_docs = cached_search(
+        "wikipedia", search_query,
+        lambda: WikipediaLoader(query=search_query, 
+                                load_max_docs=2).load(),
+        config
+    )
 
      # Format
     formatted_search_docs = "\n\n---\n\n".join(
@@ -316,18 +407,20 @@ def search_wikipedia(state: InterviewState):
     return {"context": [formatted_search_docs]} 
 
 # node to generate the answer
-def generate_answer(state: InterviewState):
+def generate_answer(state: InterviewState, config: RunnableConfig = None):
     """ Node to answer a question """
+    if budget_exceeded(config, *LLM_RESOURCES):
+        return {}
 
     # Get state
     analyst = state["analyst"]
     messages = state["messages"]
     context = state["context"]
 
-    answer_instructions = read_prompt_file("answer_instructions")
-    # Answer question
-    system_message = answer_instructions.format(goals=analyst.persona, context=context)
-    answer = model.invoke([SystemMessage(content=system_message)]+messages)
+    # Answer question from the documents most relevant to it
+    context = select_context(context, messages[-1].content, INTERVIEW_CONTEXT_MAX_TOKENS)
+    system_message = prompts.format("answer_instructions", goals=analyst.persona, context=context)
+    answer = chat_model(config).invoke([SystemMessage(content=system_message)]+messages)
             
     # Name the message as coming from the expert
     answer.name = "expert"
@@ -344,8 +437,12 @@ def save_interview(state: InterviewState):
     # Save to interviews key
     return {"interview": interview}
 
-def route_messages(state: InterviewState, name: str = "expert"):
+def route_messages(state: InterviewState, config: RunnableConfig = None, name: str = "expert"):
     """ Route between question and answer """
+    # End the interview early once the run's budget is used up
+    if budget_exceeded(config, *LLM_RESOURCES):
+        return 'save_interview'
+
     # Get messages
     messages = state["messages"]
     max_num_turns = state.get('max_num_turns',2)
@@ -368,18 +465,22 @@ def route_messages(state: InterviewState, name: str = "expert"):
     return "ask_question"
 
 
-def write_section(state: InterviewState):
+def write_section(state: InterviewState, config: RunnableConfig = None):
     """ Node to answer a question """
 
     # Get state
     interview = state["interview"]
     context = state["context"]
     analyst = state["analyst"]
+
+    # Over budget the section is still written from what was gathered, unless that is nothing
+    if not context and budget_exceeded(config, *LLM_RESOURCES):
+        return {"sections": []}
    
-    section_writer_instructions = read_prompt_file("section_writer_instructions")
     # Write section using either the gathered source docs from interview (context) or the interview itself (interview)
-    system_message = section_writer_instructions.format(focus=analyst.description)
-    section = model.invoke([SystemMessage(content=system_message)]+[HumanMessage(content=f"Use this source to write your section: {context}")]) 
+    context = select_context(context, analyst.description, INTERVIEW_CONTEXT_MAX_TOKENS)
+    system_message = prompts.format("section_writer_instructions", focus=analyst.description)
+    section = chat_model(config).invoke([SystemMessage(content=system_message)]+[HumanMessage(content=f"Use this source to write your section: {context}")]) 
                 
     # Append it to state
     return {"sections": [section.content]}
@@ -387,6 +488,7 @@ def write_section(state: InterviewState):
 # Add nodes and edges 
 interview_builder = StateGraph(InterviewState)
 interview_builder.add_node("ask_question", generate_question)
+interview_builder.add_node("generate_search_query", generate_search_query)
 interview_builder.add_node("search_web", search_web)
 interview_builder.add_node("search_wikipedia", search_wikipedia)
 interview_builder.add_node("answer_question", generate_answer)
@@ -395,8 +497,9 @@ interview_builder.add_node("write_section", write_section)
 
 # Flow
 interview_builder.add_edge(START, "ask_question")
-interview_builder.add_edge("ask_question", "search_web")
-interview_builder.add_edge("ask_question", "search_wikipedia")
+interview_builder.add_edge("ask_question", "generate_search_query")
+interview_builder.add_edge("generate_search_query", "search_web")
+interview_builder.add_edge("generate_search_query", "search_wikipedia")
 interview_builder.add_edge("search_web", "answer_question")
 interview_builder.add_edge("search_wikipedia", "answer_question")
 interview_builder.add_conditional_edges("answer_question", route_messages,['ask_question','save_interview'])
@@ -438,6 +541,7 @@ class ResearchGraphState(TypedDict):
     human_analyst_feedback: str # Human feedback
     analysts: List[Analyst] # Analyst asking questions
     sections: Annotated[list, operator.add] # Send() API key
+    memos: list # Sections merged down to a bounded number for the report writers
     introduction: str # Introduction for the final report
     content: str # Content for the final report
     conclusion: str # Conclusion for the final report
@@ -462,46 +566,72 @@ def initiate_all_interviews(state: ResearchGraphState):
                                            )
                                                        ]}) for analyst in state["analysts"]]
 
+# Hierarchical reduce: with many analysts the sections are merged in groups of
+# REPORT_MERGE_FAN_IN, level by level, so no single prompt has to hold every section
+REPORT_MERGE_FAN_IN = 4
+MERGED_MEMO_MAX_WORDS = 600
+
+def merge_sections(topic: str, sections: List[str], config: RunnableConfig = None) -> str:
+    """ Merge a small group of sections (or earlier merged memos) into one memo """
+    if len(sections) == 1:
+        return sections[0]
+    formatted_str_sections = "\n\n---\n\n".join(sections)
+    system_message = prompts.format("section_merge_instructions", topic=topic,
+                                    max_words=MERGED_MEMO_MAX_WORDS,
+                                    context=formatted_str_sections)
+    memo = chat_model(config).invoke([SystemMessage(content=system_message)]+[HumanMessage(content="Merge these memos.")], config=config)
+    return memo.content
+
+def reduce_sections(topic: str, sections: List[str], fan_in: int = REPORT_MERGE_FAN_IN) -> List[str]:
+    """ Merge sections in a tree until at most fan_in memos are left """
+    fan_in = max(2, fan_in)
+    while len(sections) > fan_in:
+        sections = [merge_sections(topic, sections[i:i + fan_in]) for i in range(0, len(sections), fan_in)]
+    return sections
+
+def merge_memos(state: ResearchGraphState):
+    """ Merge the interview sections into at most REPORT_MERGE_FAN_IN memos for the report writers """
+    return {"memos": reduce_sections(state["topic"], state["sections"])}
+
 def write_report(state: ResearchGraphState):
-    # Full set of sections
-    sections = state["sections"]
+    # Full set of sections (merged into memos when there are many)
+    sections = state.get("memos") or state["sections"]
     topic = state["topic"]
 
     # Concat all sections together
     formatted_str_sections = "\n\n".join([f"{section}" for section in sections])
     
-    report_writer_instructions = read_prompt_file("report_writer_instructions")
     # Summarize the sections into a final report
-    system_message = report_writer_instructions.format(topic=topic, context=formatted_str_sections)    
+    system_message = prompts.format("report_writer_instructions", topic=topic, context=formatted_str_sections)    
     report = model.invoke([SystemMessage(content=system_message)]+[HumanMessage(content=f"Write a report based upon these memos.")]) 
     return {"content": report.content}
 
 def write_introduction(state: ResearchGraphState):
-    # Full set of sections
-    sections = state["sections"]
+    # Full set of sections (merged into memos when there are many)
+    sections = state.get("memos") or state["sections"]
     topic = state["topic"]
 
     # Concat all sections together
     formatted_str_sections = "\n\n".join([f"{section}" for section in sections])
     
     # Summarize the sections into a final report
-    intro_conclusion_instructions = read_prompt_file("intro_conclusion_instructions")
-    instructions = intro_conclusion_instructions.format(topic=topic, formatted_str_sections=formatted_str_sections)    
+    instructions = prompts.format("intro_conclusion_instructions", topic=topic,
+                                  formatted_str_sections=formatted_str_sections)    
     intro = model.invoke([instructions]+[HumanMessage(content=f"Write the report introduction")]) 
     return {"introduction": intro.content}
 
 
 def write_conclusion(state: ResearchGraphState):
-    # Full set of sections
-    sections = state["sections"]
+    # Full set of sections (merged into memos when there are many)
+    sections = state.get("memos") or state["sections"]
     topic = state["topic"]
 
     # Concat all sections together
     formatted_str_sections = "\n\n".join([f"{section}" for section in sections])
     
     # Summarize the sections into a final report
-    intro_conclusion_instructions = read_prompt_file("intro_conclusion_instructions")
-    instructions = intro_conclusion_instructions.format(topic=topic, formatted_str_sections=formatted_str_sections)    
+    instructions = prompts.format("intro_conclusion_instructions", topic=topic,
+                                  formatted_str_sections=formatted_str_sections)    
     conclusion = model.invoke([instructions]+[HumanMessage(content=f"Write the report conclusion")]) 
     return {"conclusion": conclusion.content}
 
@@ -529,6 +659,7 @@ builder = StateGraph(ResearchGraphState)
 builder.add_node("create_analysts", create_analysts)
 builder.add_node("human_feedback", human_feedback)
 builder.add_node("conduct_interview", interview_builder.compile())
+builder.add_node("merge_memos", merge_memos)
 builder.add_node("write_report",write_report)
 builder.add_node("write_introduction",write_introduction)
 builder.add_node("write_conclusion",write_conclusion)
@@ -538,9 +669,10 @@ builder.add_node("finalize_report",finalize_report)
 builder.add_edge(START, "create_analysts")
 builder.add_edge("create_analysts", "human_feedback")
 builder.add_conditional_edges("human_feedback", initiate_all_interviews, ["create_analysts", "conduct_interview"])
-builder.add_edge("conduct_interview", "write_report")
-builder.add_edge("conduct_interview", "write_introduction")
-builder.add_edge("conduct_interview", "write_conclusion")
+builder.add_edge("conduct_interview", "merge_memos")
+builder.add_edge("merge_memos", "write_report")
+builder.add_edge("merge_memos", "write_introduction")
+builder.add_edge("merge_memos", "write_conclusion")
 builder.add_edge(["write_conclusion", "write_report", "write_introduction"], "finalize_report")
 builder.add_edge("finalize_report", END)
 
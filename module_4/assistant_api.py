@@ -1,49 +1,155 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import Callable, List, Optional, Dict, Any
+import os
 import uuid
 from datetime import datetime
 import asyncio
-from threading import Thread
+import json
+import hashlib
+from contextlib import asynccontextmanager
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
 import time
 
 # Import from your assistant.py
 from assistant import (
-    # For analyst generation part
-    StateGraph, GenerateAnalystsState, create_analysts, human_feedback, should_continue,
-    MemorySaver, Analyst, END, START,
-    # For interview part  
-    # interview_graph,
-    interview_builder,
+    Analyst,
     # Other imports
-    model, read_prompt_file
+    model, read_prompt_file, merge_sections, create_analysts_batch, search_cache, llm_cache, shared_cache_model,
+    REPORT_MERGE_FAN_IN
 )
+from bounded_checkpointer import BoundedMemorySaver
+from durable_checkpointer import DurableSqliteSaver
+from graph_registry import get_compiled_graph
+from interview_cache import create_interview_cache
+from job_claimer import JobClaimer
+from job_scheduler import CancellationToken, JobCancelled, JobScheduler, QueueFullError, SchedulerClosedError
+from job_store import QUEUED, RUNNING, SQLiteJobStore
+import metrics
+from progress_events import ProgressEventLog, SQLiteProgressEventLog
+from report_reducer import IncrementalSectionReducer
+from resource_budget import (
+    BudgetCallbackHandler, ResourceBudget, TenantBudgets, limits_from_env, register_budget, release_budget
+)
+from request_coalescer import RequestCoalescer, COMPUTED
+from session_store import create_session_store
 
 # POST /research/start → Generate analysts
+# POST /research/batch → Generate analysts for many topics and queue their research
+# GET /research/batch/{batch_id} → Aggregate progress of a batch
 # GET /research/{session_id}/analysts → Review analysts
 # PUT /research/{session_id}/feedback → Optional feedback
 # POST /research/{session_id}/continue → Start interviews (returns immediately)
+# POST /research/{session_id}/cancel → Stop a queued or running research process
 # GET /research/{session_id}/progress → Check real-time progress
+# GET /research/{session_id}/events → Server-sent progress events (push instead of polling)
 # GET /research/{session_id}/report → Get final report (when completed)
+# GET /metrics → Prometheus metrics (node latencies, LLM usage, queue depth, search cache)
+
+
+# Checkpoints are kept in memory but bounded: threads idle for CHECKPOINT_TTL_SECONDS expire,
+# and least recently used threads are evicted once CHECKPOINT_MAX_BYTES is exceeded
+CHECKPOINT_TTL_SECONDS = float(os.getenv("CHECKPOINT_TTL_SECONDS", "3600"))
+CHECKPOINT_MAX_BYTES = int(os.getenv("CHECKPOINT_MAX_BYTES", str(256 * 1024 * 1024)))
+
+def create_checkpointer() -> BoundedMemorySaver:
+    return BoundedMemorySaver(ttl_seconds=CHECKPOINT_TTL_SECONDS, max_bytes=CHECKPOINT_MAX_BYTES)
 
+# With SESSION_STORE=sqlite research jobs are durable and shared by every worker process (uvicorn
+# --workers N): graph checkpoints go to CHECKPOINT_DB_PATH, and jobs and progress events to the
+# session database. Any worker can serve any session, each queued job is claimed by exactly one
+# worker, and jobs of a worker that stopped are resumed elsewhere from their last checkpointed step
+DURABLE_JOBS = os.getenv("SESSION_STORE", "memory").lower() == "sqlite"
+
+if DURABLE_JOBS:
+    analyst_memory = memory = DurableSqliteSaver(os.getenv("CHECKPOINT_DB_PATH", "checkpoints.db"))
+    research_jobs = SQLiteJobStore(os.getenv("SESSION_DB_PATH", "sessions.db"))
+else:
+    analyst_memory = create_checkpointer()
+    memory = create_checkpointer()
+    research_jobs = None
+
+def with_metrics(config: Optional[Dict[str, Any]] = None, node: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Run config that records node timings and LLM usage for GET /metrics. node labels LLM
+    calls made outside a graph node (graph nodes are labelled by their own name).
+    """
+    config = dict(config or {})
+    config["callbacks"] = [*(config.get("callbacks") or []), metrics.node_metrics]
+    if node:
+        config["metadata"] = {**(config.get("metadata") or {}), "metrics_node": node}
+    return config
 
 # Create the analyst generation graph
 def create_analyst_graph():
-    builder = StateGraph(GenerateAnalystsState)
-    builder.add_node("create_analysts", create_analysts)
-    builder.add_node("human_feedback", human_feedback)
-    builder.add_edge(START, "create_analysts")
-    builder.add_edge("create_analysts", "human_feedback")
-    builder.add_conditional_edges("human_feedback", should_continue, ["create_analysts", END])
-    memory = MemorySaver()
-    return builder.compile(interrupt_before=['human_feedback'], checkpointer=memory)
+    return get_compiled_graph("analyst", checkpointer=analyst_memory, interrupt_before=["human_feedback"])
 
 # Create graphs
 analyst_graph = create_analyst_graph()
-memory = MemorySaver()
+
+def get_interview_graph():
+    """The interview sub-graph, compiled once per process and shared by every interview"""
+    return get_compiled_graph("interview", checkpointer=memory, run_name="Conduct Interviews")
+
+# Maximum number of analyst interviews run at the same time for one session.
+# Can be overridden per request via POST /research/{session_id}/continue?max_concurrency=N
+MAX_CONCURRENT_INTERVIEWS = int(os.getenv("MAX_CONCURRENT_INTERVIEWS", "3"))
+
+# Analyst generation is a blocking LLM call, so the async endpoints hand it to this
+# bounded pool instead of running it on the event loop
+ANALYST_WORKERS = int(os.getenv("ANALYST_WORKERS", "4"))
+analyst_executor = ThreadPoolExecutor(max_workers=ANALYST_WORKERS, thread_name_prefix="analyst")
+
+# Research jobs started by /continue run on a fixed pool of workers behind a bounded queue;
+# when the queue is full new jobs are rejected with 429 instead of piling up. With shared state
+# the queue is the job table, and RESEARCH_WORKERS is the number of jobs each process runs
+RESEARCH_WORKERS = int(os.getenv("RESEARCH_WORKERS", "2"))
+RESEARCH_QUEUE_DEPTH = int(os.getenv("RESEARCH_QUEUE_DEPTH", "10"))
+research_scheduler = JobScheduler(max_workers=RESEARCH_WORKERS, max_queue_depth=RESEARCH_QUEUE_DEPTH, name="research")
+
+# Default per-session deadline (seconds from /continue) after which pending interviews are
+# stopped and the report is written from what was finished; 0 means no deadline
+RESEARCH_DEADLINE_SECONDS = float(os.getenv("RESEARCH_DEADLINE_SECONDS", "0"))
+
+# Cancellation token of every queued or running research job, by session id
+cancellation_tokens: Dict[str, CancellationToken] = {}
+
+# Sessions in these states have no job queued or running
+TERMINAL_STATUSES = ("completed", "partially_completed", "cancelled", "error")
+
+# On shutdown, running research jobs get SHUTDOWN_DRAIN_SECONDS to finish. Jobs still running
+# after that are interrupted at their next interview step and get SHUTDOWN_GRACE_SECONDS more
+# to stop; interrupted and queued jobs keep their checkpoints and are resumed by another worker
+# or the next process
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "30"))
+SHUTDOWN_GRACE_SECONDS = float(os.getenv("SHUTDOWN_GRACE_SECONDS", "10"))
+
+# Incremental progress events, pushed to clients over GET /research/{session_id}/events. The
+# events of a finished session are dropped PROGRESS_EVENTS_RETENTION_SECONDS after it finished,
+# and any event is dropped once as old as a session may live (SESSION_TTL_SECONDS)
+PROGRESS_EVENTS_RETENTION_SECONDS = float(os.getenv("PROGRESS_EVENTS_RETENTION_SECONDS", "300"))
+PROGRESS_EVENTS_MAX_AGE_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", str(24 * 3600))) or None
+progress_events = (
+    SQLiteProgressEventLog(os.getenv("SESSION_DB_PATH", "sessions.db"),
+                           retention_seconds=PROGRESS_EVENTS_RETENTION_SECONDS,
+                           max_age_seconds=PROGRESS_EVENTS_MAX_AGE_SECONDS)
+    if DURABLE_JOBS else
+    ProgressEventLog(retention_seconds=PROGRESS_EVENTS_RETENTION_SECONDS,
+                     max_age_seconds=PROGRESS_EVENTS_MAX_AGE_SECONDS)
+)
+SSE_HEARTBEAT_SECONDS = 15
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if job_claimer is not None:
+        # Claims queued jobs, including those left by a stopped worker, from the shared job table
+        job_claimer.start()
+    yield
+    shutdown_research()
 
 app = FastAPI(
+    lifespan=lifespan,
     title="Research Assistant API",
     description="Multi-agent research system with human-in-the-loop feedback",
     version="1.0.0"
@@ -53,12 +159,133 @@ app = FastAPI(
 class ResearchRequest(BaseModel):
     topic: str
     max_analysts: int = 3
+    tenant: Optional[str] = None
 
 class AnalystFeedback(BaseModel):
     feedback: Optional[str] = None
 
-# In-memory storage for sessions
-sessions: Dict[str, Dict[str, Any]] = {}
+class BatchResearchRequest(BaseModel):
+    topics: List[str]
+    max_analysts: int = 3
+    max_concurrency: Optional[int] = None
+    deadline_seconds: Optional[float] = None
+    tenant: Optional[str] = None
+
+# Session storage: bounded in-memory by default, SQLite with SESSION_STORE=sqlite. The progress
+# events of a session the in-memory store evicts go with it
+sessions = create_session_store(on_remove=progress_events.clear)
+
+# Batch records (topics and their session ids), kept in the same kind of store as sessions
+batches = create_session_store(table="batches")
+
+# Most topics accepted by one POST /research/batch
+MAX_BATCH_TOPICS = int(os.getenv("MAX_BATCH_TOPICS", "50"))
+
+# Finished interviews by topic and analyst persona, so a re-run after feedback (or another
+# session on the same topic) only interviews new or changed analysts; kept apart from the
+# sessions, for INTERVIEW_CACHE_TTL_SECONDS (0 disables reuse)
+interview_cache = create_interview_cache()
+
+def get_session_or_404(session_id: str) -> Dict[str, Any]:
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+def update_session(session_id: str, mutator) -> Any:
+    """Apply a change to a stored session; changes to sessions that were removed are dropped"""
+    try:
+        return sessions.update(session_id, mutator)
+    except KeyError:
+        return None
+
+def set_session_fields(session_id: str, progress: Optional[Dict[str, Any]] = None, **fields):
+    """Set top-level session fields and/or progress fields in one atomic update"""
+    def mutate(session):
+        session.update(fields)
+        session["progress"].update(progress or {})
+    update_session(session_id, mutate)
+
+# Concurrent /research/start calls for the same topic and analyst count share one analyst
+# generation; the result is reused for ANALYST_CACHE_TTL_SECONDS afterwards (0 disables the cache)
+analyst_coalescer = RequestCoalescer(ttl_seconds=float(os.getenv("ANALYST_CACHE_TTL_SECONDS", "300")))
+
+def normalize_topic(topic: str) -> str:
+    return " ".join(topic.lower().split())
+
+def analyst_request_key(request: ResearchRequest):
+    return (normalize_topic(request.topic), request.max_analysts)
+
+def new_session(thread: Dict[str, Any], topic: str, max_analysts: int, analysts: Optional[List[Analyst]],
+                status: str = "awaiting_feedback", **fields) -> Dict[str, Any]:
+    """A new session record with analysts generated and no interviews yet"""
+    return {
+        "thread": thread,
+        "topic": topic,
+        "max_analysts": max_analysts,
+        "status": status,
+        "analysts": [analyst.dict() for analyst in analysts] if analysts else [],
+        "created_at": datetime.now().isoformat(),
+        "progress": {
+            "current_step": "analysts_generated",
+            "completed_analysts": 0,
+            "total_analysts": len(analysts) if analysts else 0,
+            "current_analyst": None,
+            "interviews": {},
+            "sections": [],
+            "version": 0
+        },
+        **fields
+    }
+
+def seed_analyst_thread(thread: Dict[str, Any], request: ResearchRequest, analysts: List[Analyst]):
+    """Put a session's analyst graph at the human feedback interruption with analysts generated elsewhere"""
+    analyst_graph.update_state(
+        thread,
+        {"topic": request.topic, "max_analysts": request.max_analysts, "analysts": analysts},
+        as_node="create_analysts"
+    )
+
+def run_analyst_graph(graph_input: Optional[Dict[str, Any]], thread: Dict[str, Any]) -> Optional[List[Analyst]]:
+    """Run the analyst graph until its next interruption and return the latest analysts"""
+    analysts = None
+    for event in analyst_graph.stream(graph_input, with_metrics(thread), stream_mode="values"):
+        if 'analysts' in event:
+            analysts = event['analysts']
+    return analysts
+
+async def run_in_analyst_executor(func, *args):
+    """Await a blocking analyst-graph call without stalling the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(analyst_executor, func, *args)
+
+def record_interview_progress(session_id: str, analyst_name: str, entry: Dict[str, Any]) -> int:
+    """
+    Store an analyst's interview progress stamped with the next progress version.
+
+    Versions increase per session, so GET /progress?since=<version> can return only the
+    interviews that changed after the version a client last saw.
+    """
+    def mutate(session):
+        progress = session["progress"]
+        version = progress.get("version", 0) + 1
+        # Store the entry before publishing the new version, so a reader that sees
+        # version N also sees every entry stamped <= N
+        progress["interviews"][analyst_name] = dict(entry, version=version)
+        progress["version"] = version
+        return version
+    return update_session(session_id, mutate)
+
+def purge_session_checkpoints(session_id: str):
+    """Drop the checkpoints of a finished session: its analyst thread and every interview thread"""
+    analyst_memory.delete_thread(session_id)
+    memory.purge_threads(f"{session_id}_analyst_")
+
+def publish_progress(session_id: str, event_type: str, **data):
+    """Publish an incremental progress event for a session"""
+    progress_events.publish(session_id, event_type, data)
+    if event_type == "status" and data.get("status") in TERMINAL_STATUSES:
+        progress_events.finish(session_id)
 
 @app.get("/", response_class=HTMLResponse)
 async def root():
@@ -98,13 +325,27 @@ async def root():
         
         <div class="endpoint">
             <span class="method post">POST</span> <strong>/research/start</strong>
-            <p>Start a new research session</p>
+            <p>Start a new research session. The optional <code>tenant</code> shares that tenant's resource budget</p>
             <pre>{
   "topic": "The benefits of adopting LangGraph as an agent framework",
   "max_analysts": 3
 }</pre>
         </div>
 
+        <div class="endpoint">
+            <span class="method post">POST</span> <strong>/research/batch</strong>
+            <p>Research many topics at once (analysts are generated in one batch, no feedback step)</p>
+            <pre>{
+  "topics": ["Solar power adoption", "Wind power adoption"],
+  "max_analysts": 3
+}</pre>
+        </div>
+
+        <div class="endpoint">
+            <span class="method get">GET</span> <strong>/research/batch/{batch_id}</strong>
+            <p>Aggregate progress of a batch and the status of each of its sessions</p>
+        </div>
+
         <div class="endpoint">
             <span class="method get">GET</span> <strong>/research/{session_id}/analysts</strong>
             <p>Get generated analysts for review</p>
@@ -112,7 +353,8 @@ async def root():
 
         <div class="endpoint">
             <span class="method put">PUT</span> <strong>/research/{session_id}/feedback</strong>
-            <p>Provide feedback on analysts (optional)</p>
+            <p>Provide feedback on analysts (optional). Also after a finished run: the next <code>/continue</code>
+            only interviews new or changed analysts</p>
             <pre>{
   "feedback": "Add someone from a startup to add an entrepreneur perspective"
 }</pre>
@@ -123,9 +365,20 @@ async def root():
             <p>Continue research process after feedback</p>
         </div>
 
+        <div class="endpoint">
+            <span class="method post">POST</span> <strong>/research/{session_id}/cancel</strong>
+            <p>Cancel a queued or running research process. <code>/continue?deadline_seconds=N</code> sets a deadline instead</p>
+        </div>
+
         <div class="endpoint">
             <span class="method get">GET</span> <strong>/research/{session_id}/progress</strong>
-            <p>Get real-time progress of research</p>
+            <p>Get real-time progress of research. Use <code>?since=&lt;version&gt;</code> to get only changed interviews
+            and <code>?summary=true</code> to leave out transcripts</p>
+        </div>
+
+        <div class="endpoint">
+            <span class="method get">GET</span> <strong>/research/{session_id}/events</strong>
+            <p>Stream progress events (server-sent events) instead of polling</p>
         </div>
 
         <div class="endpoint">
@@ -133,9 +386,19 @@ async def root():
             <p>Get the final research report</p>
         </div>
 
+        <div class="endpoint">
+            <span class="method get">GET</span> <strong>/research/{session_id}/report/partial</strong>
+            <p>Get the report as it is being written (also streamed as <code>report_token</code> events)</p>
+        </div>
+
         <div class="endpoint">
             <span class="method get">GET</span> <strong>/research/sessions</strong>
-            <p>List all research sessions</p>
+            <p>List research sessions (paginated: <code>?status=completed&amp;limit=50&amp;offset=0</code>)</p>
+        </div>
+
+        <div class="endpoint">
+            <span class="method get">GET</span> <strong>/metrics</strong>
+            <p>Prometheus metrics of this worker: node latencies, LLM calls and tokens, queue depth, active sessions, search cache</p>
         </div>
 
         <p><strong>Interactive API Docs:</strong> <a href="/docs">/docs</a> | <strong>ReDoc:</strong> <a href="/redoc">/redoc</a></p>
@@ -150,57 +413,159 @@ async def start_research(request: ResearchRequest):
     thread = {"configurable": {"thread_id": session_id}}
     
     try:
-        # Run until first interruption (human feedback)
-        events = list(analyst_graph.stream(
-            {
-                "topic": request.topic,
-                "max_analysts": request.max_analysts
-            },
-            thread,
-            stream_mode="values"
-        ))
-        
-        # Get the analysts from the last event
-        analysts = None
-        for event in events:
-            if 'analysts' in event:
-                analysts = event['analysts']
+        # Run until first interruption (human feedback) on the analyst executor,
+        # or join an identical request that is already running
+        analysts, source = await analyst_coalescer.run(
+            analyst_request_key(request),
+            lambda: run_in_analyst_executor(
+                run_analyst_graph,
+                {
+                    "topic": request.topic,
+                    "max_analysts": request.max_analysts
+                },
+                thread
+            )
+        )
+        if source != COMPUTED:
+            # The analysts came from another session's thread; give this session its own checkpoint
+            await run_in_analyst_executor(seed_analyst_thread, thread, request, analysts)
         
         # Store session data
-        sessions[session_id] = {
-            "thread": thread,
-            "topic": request.topic,
-            "max_analysts": request.max_analysts,
-            "status": "awaiting_feedback",
-            "analysts": [analyst.dict() for analyst in analysts] if analysts else [],
-            "created_at": datetime.now(),
-            "progress": {
-                "current_step": "analysts_generated",
-                "completed_analysts": 0,
-                "total_analysts": len(analysts) if analysts else 0,
-                "current_analyst": None,
-                "interviews": {},
-                "sections": []
-            }
-        }
+        sessions.create(session_id, new_session(thread, request.topic, request.max_analysts, analysts,
+                                                tenant=request.tenant))
+        
+        publish_progress(session_id, "analysts_generated", total_analysts=len(analysts) if analysts else 0)
         
         return {
             "session_id": session_id,
             "status": "awaiting_feedback",
             "message": "Analysts generated. Review them and provide feedback if needed.",
-            "analysts": [analyst.dict() for analyst in analysts] if analysts else []
+            "analysts": [analyst.dict() for analyst in analysts] if analysts else [],
+            "analysts_source": source
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error starting research: {str(e)}")
 
+@app.post("/research/batch")
+async def start_batch_research(request: BatchResearchRequest):
+    """
+    Research many topics at once.
+
+    Analysts for every topic are generated with one batched model call (repeated topics
+    share one generation) and each topic's research is queued right away, without the
+    analyst feedback step. Every topic gets a regular session; follow them together with
+    GET /research/batch/{batch_id}. The sessions share search results through the search
+    cache and, with LLM_CACHE enabled, model responses through the LLM cache.
+    """
+    topics = [topic.strip() for topic in request.topics if topic.strip()]
+    if not topics:
+        raise HTTPException(status_code=422, detail="No topics given")
+    if len(topics) > MAX_BATCH_TOPICS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_BATCH_TOPICS} topics per batch")
+    if research_scheduler.closed:
+        raise HTTPException(status_code=503, detail="Server is shutting down, try again later")
+    
+    unique_topics: Dict[str, str] = {}
+    for topic in topics:
+        unique_topics.setdefault(normalize_topic(topic), topic)
+    try:
+        results = await run_in_analyst_executor(
+            create_analysts_batch, list(unique_topics.values()), request.max_analysts, ANALYST_WORKERS,
+            with_metrics(node="create_analysts")
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating analysts: {str(e)}")
+    analysts_by_topic = dict(zip(unique_topics, results))
+    
+    batch_id = str(uuid.uuid4())
+    entries = []
+    max_concurrency = request.max_concurrency or MAX_CONCURRENT_INTERVIEWS
+    for topic in topics:
+        analysts = analysts_by_topic[normalize_topic(topic)]
+        if isinstance(analysts, Exception):
+            entries.append({"topic": topic, "session_id": None, "status": "error", "error": str(analysts)})
+            continue
+        
+        session_id = str(uuid.uuid4())
+        session = new_session({"configurable": {"thread_id": session_id}}, topic, request.max_analysts, analysts,
+                              tenant=request.tenant,
+                              status="queued", batch_id=batch_id)
+        session["progress"]["current_step"] = "queued"
+        sessions.create(session_id, session)
+        publish_progress(session_id, "analysts_generated", total_analysts=len(analysts))
+        try:
+            # The batch was admitted as a whole, so its jobs are not held to the queue depth
+            queue_position = queue_research_job(session_id, analysts, topic, max_concurrency,
+                                                request.deadline_seconds, enforce_depth=False)
+        except SchedulerClosedError:
+            set_session_fields(session_id, status="error", error="Server is shutting down")
+            entries.append({"topic": topic, "session_id": session_id, "status": "error",
+                            "error": "Server is shutting down"})
+            continue
+        publish_progress(session_id, "status", status="queued", queue_position=queue_position, batch_id=batch_id)
+        entries.append({"topic": topic, "session_id": session_id, "status": "queued", "queue_position": queue_position})
+    
+    batches.create(batch_id, {
+        "topics": topics,
+        "status": "submitted",
+        "max_analysts": request.max_analysts,
+        "created_at": datetime.now().isoformat(),
+        "entries": entries
+    })
+    return {
+        "batch_id": batch_id,
+        "status": "queued",
+        "message": "Batch queued. Check the batch endpoint for aggregate progress.",
+        "sessions": entries
+    }
+
+@app.get("/research/batch/{batch_id}")
+async def get_batch_progress(batch_id: str):
+    """Aggregate progress of a batch, plus the status of each of its sessions"""
+    batch = batches.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    sessions_progress = []
+    status_counts: Dict[str, int] = {}
+    total_analysts = completed_analysts = 0
+    for entry in batch["entries"]:
+        session = sessions.get(entry["session_id"]) if entry["session_id"] else None
+        if session is None:
+            status = entry["status"] if entry["status"] == "error" else "expired"
+            sessions_progress.append({**entry, "status": status, "progress_percentage": 0})
+        else:
+            progress = session.get("progress", {})
+            status = session["status"]
+            total_analysts += progress.get("total_analysts", 0)
+            completed_analysts += progress.get("completed_analysts", 0)
+            sessions_progress.append({
+                "topic": entry["topic"],
+                "session_id": entry["session_id"],
+                "status": status,
+                "progress_percentage": progress_percentage(progress),
+                "current_step": progress.get("current_step", "unknown")
+            })
+        status_counts[status] = status_counts.get(status, 0) + 1
+    
+    finished = all(item["status"] in TERMINAL_STATUSES + ("expired",) for item in sessions_progress)
+    return {
+        "batch_id": batch_id,
+        "status": "finished" if finished else "running",
+        "created_at": batch["created_at"],
+        "total_sessions": len(sessions_progress),
+        "status_counts": status_counts,
+        "progress_percentage": sum(item["progress_percentage"] for item in sessions_progress) / max(1, len(sessions_progress)),
+        "completed_analysts": completed_analysts,
+        "total_analysts": total_analysts,
+        "sessions": sessions_progress
+    }
+
 @app.get("/research/{session_id}/analysts")
 async def get_analysts(session_id: str):
     """Get the generated analysts for a session"""
-    if session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    session = sessions[session_id]
+    session = get_session_or_404(session_id)
     return {
         "session_id": session_id,
         "topic": session["topic"],
@@ -210,35 +575,45 @@ async def get_analysts(session_id: str):
 
 @app.put("/research/{session_id}/feedback")
 async def provide_feedback(session_id: str, feedback: AnalystFeedback):
-    """Provide feedback on the generated analysts"""
-    if session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    session = sessions[session_id]
+    """
+    Provide feedback on the generated analysts.
+
+    Also works after the research finished: the analysts are regenerated and the next
+    /continue only interviews analysts that are new or changed.
+    """
+    session = get_session_or_404(session_id)
     thread = session["thread"]
     
-    try:
+    if research_scheduler.is_active(session_id) or (research_jobs is not None and research_jobs.is_active(session_id)):
+        raise HTTPException(status_code=409, detail=f"Research already {session['status']} for this session")
+    
+    def apply_feedback():
+        if not analyst_graph.get_state(thread).values:
+            # The analyst thread is purged when a research run finishes; rebuild it from the session
+            request = ResearchRequest(topic=session["topic"], max_analysts=session["max_analysts"])
+            seed_analyst_thread(thread, request, [Analyst(**analyst) for analyst in session["analysts"]])
         # Update state with human feedback
         analyst_graph.update_state(
             thread, 
             {"human_analyst_feedback": feedback.feedback}, 
             as_node="human_feedback"
         )
+    
+    try:
+        await run_in_analyst_executor(apply_feedback)
         
         if feedback.feedback:
             # If feedback provided, regenerate analysts
-            events = list(analyst_graph.stream(None, thread, stream_mode="values"))
-            
-            # Get updated analysts
-            analysts = None
-            for event in events:
-                if 'analysts' in event:
-                    analysts = event['analysts']
+            analysts = await run_in_analyst_executor(run_analyst_graph, None, thread)
             
             # Update session
-            sessions[session_id]["analysts"] = [analyst.dict() for analyst in analysts] if analysts else []
-            sessions[session_id]["status"] = "feedback_incorporated"
-            sessions[session_id]["progress"]["total_analysts"] = len(analysts) if analysts else 0
+            set_session_fields(
+                session_id,
+                progress={"total_analysts": len(analysts) if analysts else 0},
+                analysts=[analyst.dict() for analyst in analysts] if analysts else [],
+                status="feedback_incorporated"
+            )
+            publish_progress(session_id, "analysts_generated", total_analysts=len(analysts) if analysts else 0)
             
             return {
                 "message": "Feedback incorporated. New analysts generated.",
@@ -246,7 +621,7 @@ async def provide_feedback(session_id: str, feedback: AnalystFeedback):
             }
         else:
             # No feedback, ready to continue
-            sessions[session_id]["status"] = "ready_to_continue"
+            set_session_fields(session_id, status="ready_to_continue")
             return {
                 "message": "No feedback provided. Ready to continue research.",
                 "analysts": session["analysts"]
@@ -255,71 +630,321 @@ async def provide_feedback(session_id: str, feedback: AnalystFeedback):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing feedback: {str(e)}")
 
-def run_interviews_with_progress(session_id: str, analysts: List[Analyst], topic: str):
-    """Run interviews for all analysts and update progress"""
+# Interview sub-graph nodes reported as progress events while an interview runs
+INTERVIEW_NODE_EVENTS = {
+    "ask_question": "question_asked",
+    "generate_search_query": "search_query_generated",
+    "search_web": "search_completed",
+    "search_wikipedia": "search_completed",
+    "answer_question": "answer_received",
+    "save_interview": "interview_saved",
+    "write_section": "section_ready",
+}
+
+# Question/answer turns per interview
+INTERVIEW_MAX_TURNS = 2
+
+# Resource budgets: each research run may use at most SESSION_MAX_LLM_CALLS, SESSION_MAX_TOKENS,
+# SESSION_MAX_SEARCHES and SESSION_MAX_WALL_SECONDS, and all sessions of a tenant together at most
+# TENANT_MAX_LLM_CALLS, TENANT_MAX_TOKENS and TENANT_MAX_SEARCHES per TENANT_BUDGET_WINDOW_SECONDS
+# (0 or unset: unlimited). Over budget, interviews end early and the report is written from what
+# they gathered. Budgets are per worker process
+SESSION_BUDGET_LIMITS = limits_from_env("SESSION")
+tenant_budgets = TenantBudgets(limits_from_env("TENANT"),
+                               window_seconds=float(os.getenv("TENANT_BUDGET_WINDOW_SECONDS", "3600")))
+
+def new_session_budget(session_id: str) -> ResourceBudget:
+    """Budget of one research run, charged to the session's tenant as well"""
+    session = sessions.get(session_id) or {}
+    return ResourceBudget(SESSION_BUDGET_LIMITS, parent=tenant_budgets.get(session.get("tenant")))
+
+def interview_cache_key(topic: str, analyst: Analyst, max_num_turns: int) -> str:
+    """Interviews are reusable when the topic, the analyst persona and the number of turns match"""
+    payload = json.dumps([normalize_topic(topic), analyst.persona, max_num_turns])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def run_single_interview(session_id: str, index: int, analyst: Analyst, topic: str,
+                         cancel_token: Optional[CancellationToken] = None,
+                         budget: Optional[ResourceBudget] = None,
+                         shared_llm_cache: bool = False) -> Dict[str, Any]:
+    """
+    Run the interview sub-graph for one analyst and return the final interview state.
+    With shared_llm_cache (sessions of a batch) its model calls go through the shared LLM cache.
+
+    Raises JobCancelled between graph nodes once cancel_token is cancelled or past its deadline.
+    The graph's nodes charge budget (registered under the session id) and end the interview
+    early once it is used up.
+    """
+    from langchain_core.messages import HumanMessage
+    
+    cancel_token = cancel_token or CancellationToken()
+    cancel_token.raise_if_cancelled()
+
+    # Each analyst gets its own checkpoint thread so interviews can run side by side
+    interview_thread = {"configurable": {"thread_id": f"{session_id}_analyst_{index}"}}
+    messages = [HumanMessage(f"So you said you were writing an article on {topic}?")]
+    interview_graph = get_interview_graph()
+    cache_key = interview_cache_key(topic, analyst, INTERVIEW_MAX_TURNS)
+    
+    # A job resumed after a restart picks interviews up from their last checkpoint
+    snapshot = interview_graph.get_state(interview_thread)
+    if snapshot.values and not snapshot.next:
+        publish_progress(session_id, "interview_resumed", analyst=analyst.name, index=index, finished=True)
+        return snapshot.values
+    if not snapshot.values:
+        cached = interview_cache.get(cache_key)
+        if cached is not None:
+            publish_progress(session_id, "interview_reused", analyst=analyst.name, index=index)
+            return {"interview": cached["interview"], "sections": cached["sections"], "reused": True}
+    if snapshot.next:
+        publish_progress(session_id, "interview_resumed", analyst=analyst.name, index=index, finished=False)
+        graph_input = None
+    else:
+        publish_progress(session_id, "analyst_started", analyst=analyst.name, index=index)
+        graph_input = {
+            "analyst": analyst,
+            "messages": messages,
+            "max_num_turns": INTERVIEW_MAX_TURNS
+        }
+    
+    # Stream node updates so every step of the interview is pushed as it happens
+    interview_result: Dict[str, Any] = dict(snapshot.values or {})
+    run_config = with_metrics(interview_thread)
+    run_config["configurable"] = dict(interview_thread["configurable"])
+    if shared_llm_cache:
+        run_config["configurable"]["shared_llm_cache"] = True
+    if budget is not None:
+        run_config["configurable"]["budget_id"] = session_id
+        run_config["callbacks"].append(BudgetCallbackHandler(budget))
+    for mode, chunk in interview_graph.stream(graph_input, run_config, stream_mode=["updates", "values"]):
+        # Leaving the loop closes the stream, so no further nodes are started
+        cancel_token.raise_if_cancelled()
+        if mode == "values":
+            interview_result = chunk
+            continue
+        for node_name, update in chunk.items():
+            if node_name not in INTERVIEW_NODE_EVENTS:
+                continue
+            event = {"analyst": analyst.name, "node": node_name}
+            if node_name == "write_section" and update and update.get("sections"):
+                event["section"] = update["sections"][0]
+            publish_progress(session_id, INTERVIEW_NODE_EVENTS[node_name], **event)
+    
+    budget_limit = budget.exceeded() if budget is not None else None
+    if budget_limit:
+        # Possibly cut short by the budget; not reused by later runs
+        interview_result = {**interview_result, "budget_limited": budget_limit}
+    elif interview_result.get("sections"):
+        interview_cache.put(cache_key, {
+            "topic": topic,
+            "created_at": datetime.now().isoformat(),
+            "analyst": analyst.dict(),
+            "interview": interview_result.get("interview", ""),
+            "sections": interview_result["sections"]
+        })
+    return interview_result
+
+def run_interviews_with_progress(session_id: str, analysts: List[Analyst], topic: str,
+                                 max_concurrency: int = MAX_CONCURRENT_INTERVIEWS,
+                                 cancel_token: Optional[CancellationToken] = None):
+    """
+    Run interviews for all analysts in parallel and update progress as each one finishes.
+
+    When cancel_token is cancelled, pending interviews stop between nodes and the session ends
+    as "cancelled". When its deadline passes, the report is written from the finished
+    interviews and the session ends as "partially_completed". When it is cancelled for a
+    shutdown, the session ends as "interrupted" and its checkpoints are kept for a resume.
+    """
+    cancel_token = cancel_token or CancellationToken()
+    section_reducer = None
+    interrupted = False
+    budget = new_session_budget(session_id)
+    register_budget(session_id, budget)
+    # Sessions of a batch share model responses through the LLM cache (when LLM_CACHE enables it)
+    shared_llm_cache = bool((sessions.get(session_id) or {}).get("batch_id"))
+    # (progress fields, session fields, status event) written once the job's bookkeeping is
+    # done, so a client that sees the final status can start the next run right away
+    outcome = None
     try:
-        sessions[session_id]["status"] = "conducting_interviews"
-        sessions[session_id]["progress"]["current_step"] = "conducting_interviews"
+        set_session_fields(
+            session_id,
+            # A re-run after feedback starts from a clean slate, without the previous run's report;
+            # unchanged interviews come from the cache
+            progress={"current_step": "conducting_interviews", "completed_analysts": 0,
+                      "interviews": {}, "sections": []},
+            status="conducting_interviews", final_report=None, partial_report=""
+        )
+        publish_progress(session_id, "status", status="conducting_interviews", total_analysts=len(analysts))
+        
+        # sections are kept in analyst order, whatever order the interviews finish in
+        sections_by_analyst: Dict[int, List[str]] = {}
         
-        interviews_results = []
-        sections = []
+        # With many analysts, sections are merged into memos while later interviews still run
+        section_reducer = IncrementalSectionReducer(
+            topic, lambda topic, group: timed_merge_sections(topic, group, shared_llm_cache),
+            fan_in=REPORT_MERGE_FAN_IN, expected_sections=len(analysts),
+            on_merge=lambda level, size: publish_progress(session_id, "memo_merged", level=level, sections=size)
+        )
         
-        for i, analyst in enumerate(analysts):
-            # Update progress
-            sessions[session_id]["progress"]["current_analyst"] = analyst.dict()
-            sessions[session_id]["progress"]["completed_analysts"] = i
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency),
+                                thread_name_prefix=f"interview-{session_id[:8]}") as executor:
+            futures = {}
+            for i, analyst in enumerate(analysts):
+                record_interview_progress(session_id, analyst.name, {"status": "running"})
+                futures[executor.submit(run_single_interview, session_id, i, analyst, topic,
+                                        cancel_token, budget, shared_llm_cache)] = (i, analyst)
+            # current_analyst points at the first analyst still being interviewed
+            set_session_fields(session_id, progress={"current_analyst": analysts[0].dict() if analysts else None})
             
-            try:
-                # Create interview thread
-                interview_thread = {"configurable": {"thread_id": f"{session_id}_analyst_{i}"}}
+            for future in as_completed(futures):
+                i, analyst = futures[future]
+                try:
+                    interview_result = future.result()
+                    interview_progress = {
+                        "status": "completed",
+                        "interview": interview_result.get("interview", ""),
+                        "section": interview_result.get("sections", [""])[0] if interview_result.get("sections") else "",
+                        "reused": interview_result.get("reused", False)
+                    }
+                    if interview_result.get("budget_limited"):
+                        interview_progress["budget_limited"] = interview_result["budget_limited"]
+                    sections_by_analyst[i] = interview_result.get("sections") or []
+                    section_reducer.add(i, sections_by_analyst[i])
+                    publish_progress(session_id, "interview_completed", analyst=analyst.name, index=i)
+                except (JobCancelled, CancelledError):
+                    section_reducer.add(i, [])
+                    interview_progress = {"status": "cancelled"}
+                    publish_progress(session_id, "interview_cancelled", analyst=analyst.name, index=i)
+                except Exception as e:
+                    section_reducer.add(i, [])
+                    interview_progress = {
+                        "status": "error",
+                        "error": str(e)
+                    }
+                    publish_progress(session_id, "interview_failed", analyst=analyst.name, index=i, error=str(e))
                 
-                # Set up initial message
-                from langchain_core.messages import HumanMessage
-                messages = [HumanMessage(f"So you said you were writing an article on {topic}?")]
-                interview_graph = interview_builder.compile(checkpointer=memory).with_config(run_name="Conduct Interviews")
-                # Run interview
-                interview_result = interview_graph.invoke({
-                    "analyst": analyst, 
-                    "messages": messages, 
-                    "max_num_turns": 2
-                }, interview_thread)
+                record_interview_progress(session_id, analyst.name, interview_progress)
                 
-                interviews_results.append(interview_result)
+                def record_completion(session):
+                    progress = session["progress"]
+                    progress["completed_analysts"] += 1
+                    progress["sections"] = [
+                        section for idx in sorted(sections_by_analyst) for section in sections_by_analyst[idx]
+                    ]
+                    running = [a for a in analysts if progress["interviews"][a.name]["status"] == "running"]
+                    progress["current_analyst"] = running[0].dict() if running else None
+                update_session(session_id, record_completion)
                 
-                # Store interview progress
-                sessions[session_id]["progress"]["interviews"][analyst.name] = {
-                    "status": "completed",
-                    "interview": interview_result.get("interview", ""),
-                    "section": interview_result.get("sections", [""])[0] if interview_result.get("sections") else ""
-                }
-                
-                # Collect sections
-                if interview_result.get("sections"):
-                    sections.extend(interview_result["sections"])
-                    sessions[session_id]["progress"]["sections"] = sections
-                
-            except Exception as e:
-                sessions[session_id]["progress"]["interviews"][analyst.name] = {
-                    "status": "error",
-                    "error": str(e)
-                }
+                if cancel_token.cancelled:
+                    # Interviews that have not started yet are dropped right away
+                    for pending in futures:
+                        pending.cancel()
+        
+        sections = [section for idx in sorted(sections_by_analyst) for section in sections_by_analyst[idx]]
+        
+        if cancel_token.reason == "shutdown":
+            interrupted = True
+            section_reducer.close()
+            set_session_fields(session_id, progress={"current_step": "interrupted"}, status="interrupted")
+            publish_progress(session_id, "status", status="interrupted", reason="shutdown")
+            return
+        
+        if cancel_token.cancelled and (cancel_token.reason != "deadline_exceeded" or not sections):
+            section_reducer.close()
+            outcome = ({"current_step": "cancelled"}, {"status": "cancelled", "cancel_reason": cancel_token.reason},
+                       {"status": "cancelled", "reason": cancel_token.reason})
+            return
         
         # Update final progress
-        sessions[session_id]["progress"]["completed_analysts"] = len(analysts)
-        sessions[session_id]["progress"]["current_step"] = "generating_report"
+        set_session_fields(
+            session_id,
+            progress={"completed_analysts": len(analysts), "current_step": "generating_report"}
+        )
+        publish_progress(session_id, "report_started", sections_count=len(sections))
+        
+        # Only the last few merges are left; the report is written from at most REPORT_MERGE_FAN_IN memos
+        memos = section_reducer.finish()
         
-        # Generate final report
-        final_report = generate_final_report(topic, sections)
-        sessions[session_id]["final_report"] = final_report
-        sessions[session_id]["status"] = "completed"
-        sessions[session_id]["progress"]["current_step"] = "completed"
+        # Generate final report, streaming it into report_token events and partial_report
+        final_report = generate_final_report(topic, memos, on_chunk=ReportStreamWriter(session_id),
+                                             shared_llm_cache=shared_llm_cache)
+        # A deadline that stopped some interviews leaves a report built from the finished ones
+        status = "partially_completed" if cancel_token.cancelled else "completed"
+        outcome = ({"current_step": "completed"},
+                   {"final_report": final_report, "partial_report": final_report, "status": status},
+                   {"status": status})
+        publish_progress(session_id, "report_completed", report_length=len(final_report))
         
     except Exception as e:
-        sessions[session_id]["status"] = "error"
-        sessions[session_id]["error"] = str(e)
+        if section_reducer is not None:
+            section_reducer.close()
+        outcome = ({}, {"status": "error", "error": str(e)}, {"status": "error", "error": str(e)})
+    
+    finally:
+        cancellation_tokens.pop(session_id, None)
+        release_budget(session_id)
+        usage = {**budget.usage(), "limit_reached": budget.exceeded()}
+        if outcome is not None:
+            outcome[0]["usage"] = usage
+        else:
+            set_session_fields(session_id, progress={"usage": usage})
+        if interrupted:
+            # Back in the queue with its checkpoints, for another worker or the next process
+            if research_jobs is not None:
+                research_jobs.release(session_id, job_claimer.worker_id)
+        else:
+            if research_jobs is not None:
+                research_jobs.finish(session_id)
+            # Everything the session needs is in the session store now
+            purge_session_checkpoints(session_id)
+        if outcome is not None:
+            progress, fields, event = outcome
+            set_session_fields(session_id, progress=progress, **fields)
+            publish_progress(session_id, "status", **event)
+        if job_claimer is not None:
+            # A slot is free: claim the next job without waiting for the next poll
+            job_claimer.wake()
+
+# The partial report is written to the session store at most this often while streaming
+PARTIAL_REPORT_FLUSH_SECONDS = 0.5
 
-def generate_final_report(topic: str, sections: List[str]) -> str:
-    """Generate final report from sections"""
+class ReportStreamWriter:
+    """Receives report chunks: publishes each one as an event and periodically saves the partial report"""
+    
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.parts: List[str] = []
+        self.last_flush = 0.0
+        set_session_fields(session_id, partial_report="")
+    
+    def __call__(self, text: str):
+        self.parts.append(text)
+        publish_progress(self.session_id, "report_token", text=text)
+        if time.monotonic() - self.last_flush >= PARTIAL_REPORT_FLUSH_SECONDS:
+            self.flush()
+    
+    def flush(self):
+        set_session_fields(self.session_id, partial_report="".join(self.parts))
+        self.last_flush = time.monotonic()
+
+def timed_merge_sections(topic: str, sections: List[str], shared_llm_cache: bool = False) -> str:
+    """merge_sections, reported as the merge_memos node in GET /metrics"""
+    config = with_metrics(node="merge_memos")
+    if shared_llm_cache:
+        config["configurable"] = {"shared_llm_cache": True}
+    with metrics.node_duration.time(node="merge_memos"):
+        return merge_sections(topic, sections, config=config)
+
+def generate_final_report(topic: str, sections: List[str],
+                          on_chunk: Optional[Callable[[str], None]] = None,
+                          shared_llm_cache: bool = False) -> str:
+    """
+    Generate final report from sections.
+
+    If on_chunk is given the model output is streamed and on_chunk is called with each
+    piece of text as soon as the model produces it. With shared_llm_cache (sessions of a
+    batch) the report prompt goes through the shared LLM cache.
+    """
     try:
         # Use your model to generate a consolidated report
         from langchain_core.messages import SystemMessage, HumanMessage
@@ -336,99 +961,339 @@ Your task is to synthesize these sections into a comprehensive, well-structured
 
         sections_text = "\n\n---\n\n".join(sections)
         
-        final_report = model.invoke([
+        messages = [
             SystemMessage(content=system_prompt),
             HumanMessage(content=f"Here are the research sections:\n\n{sections_text}\n\nPlease create a comprehensive final report.")
-        ])
+        ]
         
-        return final_report.content
+        config = with_metrics(node="final_report")
+        report_model = shared_cache_model(model) if shared_llm_cache else model
+        with metrics.node_duration.time(node="final_report"):
+            if on_chunk is None:
+                return report_model.invoke(messages, config=config).content
+            
+            report_parts = []
+            for chunk in report_model.stream(messages, config=config):
+                text = chunk.content if isinstance(chunk.content, str) else "".join(
+                    part.get("text", "") if isinstance(part, dict) else str(part) for part in chunk.content
+                )
+                if text:
+                    report_parts.append(text)
+                    on_chunk(text)
+            return "".join(report_parts)
         
     except Exception as e:
+        metrics.node_errors.inc(node="final_report")
         return f"# Research Report: {topic}\n\n## Error\nFailed to generate final report: {str(e)}\n\n## Raw Sections\n\n" + "\n\n---\n\n".join(sections)
 
-@app.post("/research/{session_id}/continue")
-async def continue_research(session_id: str):
-    """Continue the research process and generate the final report"""
-    if session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
+def queue_research_job(session_id: str, analysts: List[Analyst], topic: str, max_concurrency: int,
+                       deadline_seconds: Optional[float] = None, enforce_depth: bool = True) -> int:
+    """
+    Queue the interviews and report of a session and return its queue position.
+
+    deadline_seconds defaults to RESEARCH_DEADLINE_SECONDS. With enforce_depth=False the job
+    is admitted even when RESEARCH_QUEUE_DEPTH jobs are already waiting.
+
+    Raises:
+        QueueFullError: if the queue is full.
+        SchedulerClosedError: if the server is shutting down.
+    """
+    deadline = deadline_seconds or RESEARCH_DEADLINE_SECONDS or None
+    if research_jobs is not None:
+        # Whichever worker has a free slot claims the job from the shared table
+        queue_position = research_jobs.record(session_id, {
+            "max_concurrency": max_concurrency,
+            "deadline_at": time.time() + deadline if deadline else None
+        }, max_queued=RESEARCH_QUEUE_DEPTH if enforce_depth else None)
+        job_claimer.wake()
+        return queue_position
     
-    session = sessions[session_id]
+    cancel_token = CancellationToken(deadline_seconds=deadline)
+    cancellation_tokens[session_id] = cancel_token
+    try:
+        return research_scheduler.submit(
+            session_id,
+            run_interviews_with_progress,
+            session_id, analysts, topic, max_concurrency, cancel_token,
+            enforce_depth=enforce_depth
+        )
+    except (QueueFullError, SchedulerClosedError):
+        cancellation_tokens.pop(session_id, None)
+        raise
+
+@app.post("/research/{session_id}/continue")
+async def continue_research(session_id: str, max_concurrency: Optional[int] = None,
+                            deadline_seconds: Optional[float] = None):
+    """
+    Continue the research process and generate the final report.
+
+    deadline_seconds (default RESEARCH_DEADLINE_SECONDS) bounds the time from now until the
+    interviews are stopped and the report is written from the ones that finished.
+    """
+    session = get_session_or_404(session_id)
     thread = session["thread"]
     
+    if research_scheduler.is_active(session_id) or (research_jobs is not None and research_jobs.is_active(session_id)):
+        raise HTTPException(status_code=409, detail=f"Research already {session['status']} for this session")
+    if research_scheduler.closed:
+        raise HTTPException(status_code=503, detail="Server is shutting down, try again later")
+    
     try:
         # If we haven't provided feedback yet, do it now with None
         if session["status"] == "awaiting_feedback":
-            analyst_graph.update_state(
-                thread, 
-                {"human_analyst_feedback": None}, 
-                as_node="human_feedback"
+            await run_in_analyst_executor(
+                lambda: analyst_graph.update_state(
+                    thread, 
+                    {"human_analyst_feedback": None}, 
+                    as_node="human_feedback"
+                )
             )
         
         # Get analysts
         analysts = [Analyst(**analyst_data) for analyst_data in session["analysts"]]
         topic = session["topic"]
         
-        # Start interviews in background thread
-        interview_thread = Thread(
-            target=run_interviews_with_progress, 
-            args=(session_id, analysts, topic)
-        )
-        interview_thread.start()
-        
-        return {
-            "session_id": session_id,
-            "status": "processing",
-            "message": "Research process started. Check progress endpoint for updates.",
-            "total_analysts": len(analysts)
-        }
+        # Mark the session queued before submitting; a free worker may pick it up right away
+        previous_status = session["status"]
+        previous_step = session["progress"]["current_step"]
+        set_session_fields(session_id, progress={"current_step": "queued"}, status="queued")
+        try:
+            queue_position = queue_research_job(session_id, analysts, topic,
+                                                max_concurrency or MAX_CONCURRENT_INTERVIEWS, deadline_seconds)
+        except (QueueFullError, SchedulerClosedError):
+            set_session_fields(session_id, progress={"current_step": previous_step}, status=previous_status)
+            raise
+        publish_progress(session_id, "status", status="queued", queue_position=queue_position)
         
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=f"Research queue is full, try again later: {str(e)}")
+    except SchedulerClosedError:
+        raise HTTPException(status_code=503, detail="Server is shutting down, try again later")
     except Exception as e:
-        sessions[session_id]["status"] = "error"
+        set_session_fields(session_id, status="error")
         raise HTTPException(status_code=500, detail=f"Error continuing research: {str(e)}")
+    
+    return {
+        "session_id": session_id,
+        "status": "queued",
+        "queue_position": queue_position,
+        "message": "Research process queued. Check progress endpoint for updates.",
+        "total_analysts": len(analysts),
+        "max_concurrency": max_concurrency or MAX_CONCURRENT_INTERVIEWS
+    }
 
-@app.get("/research/{session_id}/progress")
-async def get_progress(session_id: str):
-    """Get real-time progress of the research process"""
-    if session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
+def summarize_interview(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Interview progress without the transcript and section bodies"""
+    summary = {key: value for key, value in entry.items() if key not in ("interview", "section")}
+    summary["interview_length"] = len(entry.get("interview") or "")
+    summary["has_section"] = bool(entry.get("section"))
+    return summary
+
+def start_claimed_job(job: Dict[str, Any]):
+    """Run a job this worker claimed from the shared job table: new, released, or left by a stopped worker"""
+    session_id = job["session_id"]
+    session = sessions.get(session_id)
+    if session is None or session["status"] in TERMINAL_STATUSES:
+        research_jobs.finish(session_id)
+        return
     
-    session = sessions[session_id]
-    progress = session.get("progress", {})
+    params = job["params"]
+    deadline_at = params.get("deadline_at")
+    # Past deadlines cancel right away, which still writes the report from finished interviews
+    cancel_token = CancellationToken(deadline_seconds=max(deadline_at - time.time(), 1e-6) if deadline_at else None)
+    if job["cancel_reason"]:
+        cancel_token.cancel(job["cancel_reason"])
+    cancellation_tokens[session_id] = cancel_token
+    analysts = [Analyst(**analyst_data) for analyst_data in session["analysts"]]
+    try:
+        research_scheduler.submit(
+            session_id,
+            run_interviews_with_progress,
+            session_id, analysts, session["topic"], params.get("max_concurrency", MAX_CONCURRENT_INTERVIEWS), cancel_token,
+            enforce_depth=False
+        )
+    except SchedulerClosedError:
+        # Shutting down: leave the job to another worker
+        cancellation_tokens.pop(session_id, None)
+        research_jobs.release(session_id, job_claimer.worker_id)
+        return
+    if job["attempts"] > 1:
+        # Interviews resume from their checkpoints
+        publish_progress(session_id, "status", status="resumed", attempts=job["attempts"])
+
+def apply_cancel_request(session_id: str, reason: str):
+    """Cancel a local job that /cancel was called for on another worker"""
+    cancel_token = cancellation_tokens.get(session_id)
+    if cancel_token is not None:
+        cancel_token.cancel(reason)
+
+# Claims jobs from the shared job table for this worker; a worker that stops renewing the
+# lease on its running jobs for JOB_LEASE_SECONDS is considered gone and its jobs are resumed
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "30"))
+job_claimer = (JobClaimer(research_jobs, research_scheduler, start_claimed_job,
+                          on_cancel_requested=apply_cancel_request, lease_seconds=JOB_LEASE_SECONDS)
+               if research_jobs is not None else None)
+
+def shutdown_research(drain_seconds: float = SHUTDOWN_DRAIN_SECONDS,
+                      grace_seconds: float = SHUTDOWN_GRACE_SECONDS) -> Dict[str, List[str]]:
+    """
+    Stop research work before the process exits.
+
+    New jobs are refused and queued jobs are not started. Running jobs get drain_seconds to
+    finish; the rest are interrupted at their next interview step. Queued and interrupted
+    sessions are left "interrupted" with their checkpoints, and with SESSION_STORE=sqlite
+    another worker or the next process resumes them. Returns the ids of the jobs not started and of those interrupted.
+    """
+    not_started = research_scheduler.shutdown(wait=False, cancel_queued=True)
+    for session_id in not_started:
+        cancellation_tokens.pop(session_id, None)
+        if research_jobs is not None:
+            research_jobs.release(session_id, job_claimer.worker_id)
+        set_session_fields(session_id, progress={"current_step": "interrupted"}, status="interrupted")
+        publish_progress(session_id, "status", status="interrupted", reason="shutdown")
+    
+    interrupted = []
+    if not research_scheduler.join(drain_seconds):
+        interrupted = research_scheduler.running_jobs()
+        for session_id in interrupted:
+            cancel_token = cancellation_tokens.get(session_id)
+            if cancel_token is not None:
+                cancel_token.cancel("shutdown")
+        # Each job stops once the node it is running finishes and its checkpoint is written
+        research_scheduler.join(grace_seconds)
+    if job_claimer is not None:
+        job_claimer.stop()
+    analyst_executor.shutdown(wait=False, cancel_futures=True)
+    return {"not_started": not_started, "interrupted": interrupted}
+
+@app.post("/research/{session_id}/cancel")
+async def cancel_research(session_id: str):
+    """Cancel a queued or running research job; running interviews stop at their next node"""
+    session = get_session_or_404(session_id)
     
-    # Calculate progress percentage
+    if research_scheduler.cancel(session_id) or (research_jobs is not None and research_jobs.cancel_queued(session_id)):
+        # Still waiting in the queue: nothing has run yet
+        cancellation_tokens.pop(session_id, None)
+        if research_jobs is not None:
+            research_jobs.finish(session_id)
+        set_session_fields(session_id, progress={"current_step": "cancelled"},
+                           status="cancelled", cancel_reason="cancelled")
+        publish_progress(session_id, "status", status="cancelled", reason="cancelled")
+        return {"session_id": session_id, "status": "cancelled", "message": "Queued research cancelled."}
+    
+    cancel_token = cancellation_tokens.get(session_id)
+    # A job running on another worker sees the request at its next lease renewal
+    if session["status"] in TERMINAL_STATUSES or (
+        cancel_token is None and (research_jobs is None or not research_jobs.request_cancel(session_id))
+    ):
+        raise HTTPException(status_code=409, detail=f"No research running for this session. Current status: {session['status']}")
+    
+    if cancel_token is not None:
+        cancel_token.cancel()
+    return {
+        "session_id": session_id,
+        "status": "cancelling",
+        "message": "Cancellation requested. Running interviews stop at their next step."
+    }
+
+def progress_percentage(progress: Dict[str, Any]) -> float:
+    """Rough completion of a session: interviews count for 80%, the report for the rest"""
+    total_analysts = progress.get("total_analysts", 0)
+    completed_analysts = progress.get("completed_analysts", 0)
+    if total_analysts <= 0:
+        return 0
+    if progress.get("current_step") == "completed":
+        return 100
+    if progress.get("current_step") == "generating_report":
+        return 90
+    return min(90, (completed_analysts / total_analysts) * 80)
+
+@app.get("/research/{session_id}/progress")
+async def get_progress(session_id: str, since: Optional[int] = None, summary: bool = False):
+    """
+    Get real-time progress of the research process.
+
+    Pass the `version` from a previous response as `since` to receive only the interviews
+    that changed after it, and `summary=true` to leave out interview transcripts and sections.
+    """
+    session = get_session_or_404(session_id)
+    progress = session.get("progress", {})
     total_analysts = progress.get("total_analysts", 0)
     completed_analysts = progress.get("completed_analysts", 0)
     
-    progress_percentage = 0
-    if total_analysts > 0:
-        if progress.get("current_step") == "completed":
-            progress_percentage = 100
-        elif progress.get("current_step") == "generating_report":
-            progress_percentage = 90
-        else:
-            progress_percentage = min(90, (completed_analysts / total_analysts) * 80)
+    # Read the version before the interviews: every entry stamped <= version is already stored
+    version = progress.get("version", 0)
+    interviews = {
+        name: entry for name, entry in list(progress.get("interviews", {}).items())
+        if since is None or entry.get("version", 0) > since
+    }
+    if summary:
+        interviews = {name: summarize_interview(entry) for name, entry in interviews.items()}
     
     return {
         "session_id": session_id,
         "status": session["status"],
-        "progress_percentage": progress_percentage,
+        "progress_percentage": progress_percentage(progress),
         "current_step": progress.get("current_step", "unknown"),
         "completed_analysts": completed_analysts,
         "total_analysts": total_analysts,
         "current_analyst": progress.get("current_analyst"),
-        "interviews": progress.get("interviews", {}),
-        "sections_count": len(progress.get("sections", []))
+        "queue_position": (research_jobs.queue_position(session_id) if research_jobs is not None
+                           else research_scheduler.queue_position(session_id)),
+        "version": version,
+        "since": since,
+        "interviews": interviews,
+        "sections_count": len(progress.get("sections", [])),
+        "usage": progress.get("usage")
     }
 
+def format_sse(event: Dict[str, Any]) -> str:
+    """Format a progress event as a server-sent-events message"""
+    payload = dict(event["data"], timestamp=event["timestamp"])
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+@app.get("/research/{session_id}/events")
+async def stream_progress_events(session_id: str, request: Request, after: Optional[int] = None):
+    """Push incremental progress events as server-sent events until the session finishes"""
+    get_session_or_404(session_id)
+    
+    # Resume from the Last-Event-ID header sent by reconnecting EventSource clients
+    last_event_id = request.headers.get("last-event-id")
+    cursor = after if after is not None else int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+    
+    async def event_stream():
+        nonlocal cursor
+        wakeup = progress_events.subscribe(session_id)
+        try:
+            while True:
+                wakeup.clear()
+                for event in progress_events.events_since(session_id, cursor):
+                    cursor = event["id"]
+                    yield format_sse(event)
+                if (sessions.get(session_id) or {}).get("status", "error") in TERMINAL_STATUSES:
+                    break
+                if await request.is_disconnected():
+                    break
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # comment line keeps proxies from closing an idle connection
+                    yield ": heartbeat\n\n"
+        finally:
+            progress_events.unsubscribe(session_id, wakeup)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/research/{session_id}/report")
 async def get_report(session_id: str):
     """Get the final research report"""
-    if session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    session = sessions[session_id]
+    session = get_session_or_404(session_id)
     
-    if session["status"] not in ["completed"]:
+    if session["status"] not in ["completed", "partially_completed"]:
         raise HTTPException(status_code=400, detail=f"Research not completed yet. Current status: {session['status']}")
     
     if not session.get("final_report"):
@@ -437,6 +1302,7 @@ async def get_report(session_id: str):
         if sections:
             final_report = generate_final_report(session["topic"], sections)
             session["final_report"] = final_report
+            set_session_fields(session_id, final_report=final_report)
         else:
             raise HTTPException(status_code=404, detail="Report not found and no sections available")
     
@@ -448,28 +1314,38 @@ async def get_report(session_id: str):
         "analysts_used": len(session.get("analysts", []))
     }
 
-@app.get("/research/sessions")
-async def list_sessions():
-    """List all research sessions"""
-    session_list = []
-    for session_id, session_data in sessions.items():
-        session_list.append({
-            "session_id": session_id,
-            "topic": session_data["topic"],
-            "status": session_data["status"],
-            "created_at": session_data["created_at"],
-            "analysts_count": len(session_data.get("analysts", []))
-        })
+@app.get("/research/{session_id}/report/partial")
+async def get_partial_report(session_id: str):
+    """Get the report generated so far; available while the final report is still being written"""
+    session = get_session_or_404(session_id)
+    current_step = session.get("progress", {}).get("current_step")
+    
+    if current_step not in ("generating_report", "completed"):
+        raise HTTPException(status_code=400, detail=f"Report generation has not started yet. Current step: {current_step}")
     
-    return {"sessions": session_list}
+    complete = session["status"] in ("completed", "partially_completed")
+    return {
+        "session_id": session_id,
+        "topic": session["topic"],
+        # While a run writes its report, only its own streamed text counts
+        "report": (session.get("final_report") if complete else None) or session.get("partial_report") or "",
+        "complete": complete
+    }
+
+@app.get("/research/sessions")
+async def list_sessions(status: Optional[str] = None, limit: int = Query(50, ge=1, le=500), offset: int = Query(0, ge=0),
+                        created_after: Optional[str] = None, created_before: Optional[str] = None):
+    """List research sessions, newest first, optionally filtered by status and creation time (ISO 8601)"""
+    session_list, total = sessions.list(
+        status=status, limit=limit, offset=offset,
+        created_after=created_after, created_before=created_before
+    )
+    return {"sessions": session_list, "total": total, "limit": limit, "offset": offset}
 
 @app.get("/research/{session_id}/status")
 async def get_session_status(session_id: str):
     """Get the current status of a research session"""
-    if session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    session = sessions[session_id]
+    session = get_session_or_404(session_id)
     return {
         "session_id": session_id,
         "status": session["status"],
@@ -477,6 +1353,56 @@ async def get_session_status(session_id: str):
         "created_at": session["created_at"]
     }
 
+@app.get("/system/checkpoints")
+async def get_checkpoint_memory():
+    """Current memory footprint of the in-memory checkpointers"""
+    return {
+        "analyst_checkpoints": analyst_memory.stats(),
+        "interview_checkpoints": memory.stats()
+    }
+
+queue_depth_gauge = metrics.registry.gauge("research_queue_depth", "Research jobs waiting for a worker")
+running_jobs_gauge = metrics.registry.gauge("research_running_jobs", "Research jobs being run", ["scope"])
+active_sessions_gauge = metrics.registry.gauge("research_active_sessions", "Sessions with research queued or running", ["status"])
+search_cache_gauge = metrics.registry.gauge("research_search_cache", "Search cache entries and lookups", ["kind"])
+llm_cache_gauge = metrics.registry.gauge("research_llm_cache", "LLM response cache entries and lookups", ["kind"])
+interview_cache_gauge = metrics.registry.gauge("research_interview_cache", "Interview cache entries and lookups", ["kind"])
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Metrics in the Prometheus text format. Node, LLM and search metrics are per worker
+    process; queue and session gauges read the shared stores when SESSION_STORE=sqlite.
+    """
+    scheduler_stats = research_scheduler.stats()
+    running_jobs_gauge.set(scheduler_stats["running"], scope="worker")
+    if research_jobs is not None:
+        job_counts = research_jobs.counts()
+        queue_depth_gauge.set(job_counts.get(QUEUED, 0))
+        running_jobs_gauge.set(job_counts.get(RUNNING, 0), scope="all")
+    else:
+        queue_depth_gauge.set(scheduler_stats["queued"])
+    for status in ("queued", "conducting_interviews"):
+        active_sessions_gauge.set(sessions.list(status=status, limit=1)[1], status=status)
+    cache_stats = search_cache.stats()
+    for kind in ("entries", "documents", "hits", "misses"):
+        if kind in cache_stats:
+            search_cache_gauge.set(cache_stats[kind], kind=kind)
+    for kind, value in interview_cache.stats().items():
+        if kind != "ttl_seconds":
+            interview_cache_gauge.set(value, kind=kind)
+    if llm_cache is not None:
+        for kind, value in llm_cache.stats().items():
+            if kind != "ttl_seconds":
+                llm_cache_gauge.set(value, kind=kind)
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Several worker processes need the state they share: SESSION_STORE=sqlite
+    workers = int(os.getenv("API_WORKERS", "1"))
+    if workers > 1 and not DURABLE_JOBS:
+        raise SystemExit("API_WORKERS > 1 requires SESSION_STORE=sqlite")
+    # Bound how long open requests (e.g. event streams) may delay the shutdown hook
+    uvicorn.run("assistant_api:app", host="0.0.0.0", port=8000, workers=workers,
+                timeout_graceful_shutdown=int(SHUTDOWN_DRAIN_SECONDS))
\ No newline at end of file
@@ -0,0 +1,53 @@
+"""
+Micro-benchmark: compiling the graphs on every use vs. reusing the cached instance
+from graph_registry.
+
+    python bench_graph_compile.py --iterations 200
+
+No LLM or search calls are made; only graph compilation is timed.
+"""
+import argparse
+import os
+import timeit
+
+# assistant.py asks for the API keys at import time; nothing is called here
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+
+from assistant import MemorySaver  # noqa: E402
+from graph_registry import GRAPH_BUILDERS, clear_compiled_graphs, get_compiled_graph  # noqa: E402
+
+COMPILE_OPTIONS = {
+    "analyst": {"interrupt_before": ["human_feedback"]},
+    "interview": {"run_name": "Conduct Interviews"},
+    "research": {"interrupt_before": ["human_feedback"]},
+}
+
+
+def compile_fresh(name: str, checkpointer):
+    options = COMPILE_OPTIONS[name]
+    graph = GRAPH_BUILDERS[name]().compile(checkpointer=checkpointer,
+                                           interrupt_before=options.get("interrupt_before"))
+    if options.get("run_name"):
+        graph = graph.with_config(run_name=options["run_name"])
+    return graph
+
+
+def main(iterations: int):
+    checkpointer = MemorySaver()
+    clear_compiled_graphs()
+    print(f"{'graph':<10} {'compile/call':>14} {'cached/call':>14} {'speedup':>10}")
+    for name in GRAPH_BUILDERS:
+        fresh = timeit.timeit(lambda: compile_fresh(name, checkpointer), number=iterations) / iterations
+        get_compiled_graph(name, checkpointer=checkpointer, **COMPILE_OPTIONS[name])  # warm the cache
+        cached = timeit.timeit(
+            lambda: get_compiled_graph(name, checkpointer=checkpointer, **COMPILE_OPTIONS[name]),
+            number=iterations
+        ) / iterations
+        print(f"{name:<10} {fresh * 1e3:>11.3f} ms {cached * 1e6:>11.3f} us {fresh / cached:>9.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    main(parser.parse_args().iterations)
@@ -0,0 +1,373 @@
+"""
+Offline benchmark: end-to-end throughput of the research API without Gemini or Tavily.
+
+    python bench_research_api.py --sessions 40 --concurrency 8 --llm-latency 0.2
+    python bench_research_api.py --json results.json
+    python bench_research_api.py --baseline results.json --tolerance 0.2
+
+The app from assistant_api.py runs in this process behind a real uvicorn server, with the
+chat model, Tavily and Wikipedia replaced by deterministic fakes: every call sleeps for the
+configured latency and returns output of the configured size, derived from a hash of its
+input so repeated runs do the same work. Each simulated client runs whole sessions:
+
+    POST /start -> (every --feedback-every session) PUT /feedback -> POST /continue
+    -> poll GET /progress until the session ends -> GET /report
+
+The script reports sessions per minute, p50/p95/p99 latency per endpoint and the peak
+resident memory of the process. With --baseline it exits with status 1 when throughput
+dropped or an endpoint's p95 latency grew by more than --tolerance, so it can gate
+performance regressions. Server settings such as RESEARCH_WORKERS or
+MAX_CONCURRENT_INTERVIEWS are read from the environment as usual.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+from langchain_core.documents import Document
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+from load_test_progress import percentile
+
+WORDS = ("agent graph state node memory latency throughput research analyst interview "
+         "search source evidence report section summary model framework workflow").split()
+
+TERMINAL_STATUSES = ("completed", "partially_completed", "cancelled", "error")
+
+
+def input_seed(value: Any) -> int:
+    """Stable seed derived from a model or search input"""
+    if isinstance(value, list):
+        value = "\n".join(str(getattr(item, "content", item)) for item in value)
+    return int.from_bytes(hashlib.sha256(str(value).encode()).digest()[:8], "big")
+
+
+def fake_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def fake_delay(latency: float, jitter: float, rng: random.Random) -> float:
+    """latency +/- jitter (a fraction of it), deterministic for a given rng"""
+    return max(0.0, latency * (1 + jitter * (2 * rng.random() - 1)))
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that sleeps for `latency` and answers `output_tokens` words"""
+
+    latency: float = 0.2
+    jitter: float = 0.0
+    output_tokens: int = 200
+    analysts: int = 3
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        rng = random.Random(input_seed(messages))
+        time.sleep(fake_delay(self.latency, self.jitter, rng))
+        message = AIMessage(content=fake_text(rng, self.output_tokens),
+                            usage_metadata=self._usage(messages))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        rng = random.Random(input_seed(messages))
+        delay = fake_delay(self.latency, self.jitter, rng)
+        words = fake_text(rng, self.output_tokens).split()
+        # The first chunk arrives after a fifth of the latency, the rest spread over the remainder
+        time.sleep(delay / 5)
+        for word in words:
+            time.sleep(delay * 4 / 5 / max(1, len(words)))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def _usage(self, messages: List[BaseMessage]) -> Dict[str, int]:
+        input_tokens = sum(len(str(message.content).split()) for message in messages)
+        return {"input_tokens": input_tokens, "output_tokens": self.output_tokens,
+                "total_tokens": input_tokens + self.output_tokens}
+
+    def with_structured_output(self, schema, **kwargs: Any):
+        # The call still goes through _generate (latency, callbacks); its text is replaced by
+        # an instance of the schema derived from the input
+        return self | RunnableLambda(lambda message: self._structured(schema, message.content))
+
+    def _structured(self, schema, seed_text: str):
+        from assistant import Analyst
+        rng = random.Random(input_seed(seed_text))
+        if schema.__name__ == "Perspectives":
+            return schema(analysts=[
+                Analyst(affiliation=fake_text(rng, 2), name=f"Analyst {i} {rng.randrange(10000)}",
+                        role=fake_text(rng, 3), description=fake_text(rng, 30))
+                for i in range(self.analysts)
+            ])
+        if schema.__name__ == "SearchQuery":
+            return schema(search_query=fake_text(rng, 6))
+        raise NotImplementedError(f"No fake structured output for {schema.__name__}")
+
+
+class FakeSearchBackend:
+    """Sleeps for `latency` and returns `results` documents of `result_chars` characters"""
+
+    def __init__(self, latency: float = 0.3, jitter: float = 0.0, results: int = 3, result_chars: int = 1500):
+        self.latency = latency
+        self.jitter = jitter
+        self.results = results
+        self.result_chars = result_chars
+
+    def documents(self, query: str) -> List[str]:
+        rng = random.Random(input_seed(query))
+        time.sleep(fake_delay(self.latency, self.jitter, rng))
+        return [fake_text(rng, self.result_chars // 7)[:self.result_chars] for _ in range(self.results)]
+
+    def tavily(self):
+        backend = self
+
+        class FakeTavilySearch:
+            def invoke(self, params: Dict[str, Any]) -> Dict[str, Any]:
+                return {"results": [{"url": f"https://example.com/{input_seed(params['query']) % 10000}/{i}",
+                                     "content": content}
+                                    for i, content in enumerate(backend.documents(params["query"]))]}
+
+        return FakeTavilySearch()
+
+    def wikipedia_loader(self):
+        backend = self
+
+        class FakeWikipediaLoader:
+            def __init__(self, query: str, load_max_docs: int = 2):
+                self.query = query
+                self.load_max_docs = load_max_docs
+
+            def load(self) -> List[Document]:
+                return [Document(page_content=content, metadata={"source": f"wiki/{self.query}/{i}"})
+                        for i, content in enumerate(backend.documents(self.query)[:self.load_max_docs])]
+
+        return FakeWikipediaLoader
+
+
+def install_fakes(args) -> Any:
+    """Import the app with the model and search backends replaced; returns the assistant_api module"""
+    # assistant.py asks for the API keys at import time; the real services are never called
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+    if args.durable:
+        state_dir = tempfile.mkdtemp(prefix="bench-research-")
+        os.environ["SESSION_STORE"] = "sqlite"
+        os.environ["SESSION_DB_PATH"] = os.path.join(state_dir, "sessions.db")
+        os.environ["CHECKPOINT_DB_PATH"] = os.path.join(state_dir, "checkpoints.db")
+        # SESSION_STORE=sqlite also puts the search, interview (and, if enabled, LLM) caches in
+        # SQLite: fresh databases per run, so a run never answers from what an earlier run cached
+        os.environ["SEARCH_CACHE_DB_PATH"] = os.path.join(state_dir, "search_cache.db")
+        os.environ["INTERVIEW_CACHE_DB_PATH"] = os.path.join(state_dir, "interview_cache.db")
+        os.environ["LLM_CACHE_DB_PATH"] = os.path.join(state_dir, "llm_cache.db")
+
+    import assistant
+    import assistant_api
+
+    model = FakeChatModel(latency=args.llm_latency, jitter=args.jitter,
+                          output_tokens=args.llm_tokens, analysts=args.max_analysts)
+    search = FakeSearchBackend(latency=args.search_latency, jitter=args.jitter,
+                               results=args.search_results, result_chars=args.search_result_chars)
+    assistant.model = assistant_api.model = model
+    assistant.tavily_search = search.tavily()
+    assistant.WikipediaLoader = search.wikipedia_loader()
+    return assistant_api
+
+
+class ServerThread:
+    """uvicorn serving the app on a free local port, with its startup and shutdown hooks"""
+
+    def __init__(self, app):
+        import uvicorn
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, name="bench-server", daemon=True)
+
+    def __enter__(self) -> str:
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("Server failed to start")
+            time.sleep(0.01)
+        port = self.server.servers[0].sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    def __exit__(self, *exc_info):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.session_seconds: List[float] = []
+        self.statuses: Dict[str, int] = defaultdict(int)
+        self.rejected = 0
+
+    async def request(self, client: httpx.AsyncClient, label: str, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies[label].append(time.perf_counter() - started)
+        return response
+
+
+async def run_session(client: httpx.AsyncClient, recorder: Recorder, index: int, args):
+    started = time.perf_counter()
+    topic = f"{args.topic} #{index % args.topics}"
+    response = await recorder.request(client, "POST /start", "POST", "/research/start",
+                                      json={"topic": topic, "max_analysts": args.max_analysts})
+    response.raise_for_status()
+    session_id = response.json()["session_id"]
+
+    if args.feedback_every and index % args.feedback_every == 0:
+        response = await recorder.request(client, "PUT /feedback", "PUT", f"/research/{session_id}/feedback",
+                                          json={"feedback": f"Add an analyst focused on cost ({index})"})
+        response.raise_for_status()
+
+    while True:
+        response = await recorder.request(client, "POST /continue", "POST", f"/research/{session_id}/continue")
+        if response.status_code != 429:
+            break
+        # Research queue is full; back off like a client would
+        recorder.rejected += 1
+        await asyncio.sleep(args.poll_interval * 4)
+    response.raise_for_status()
+
+    while True:
+        await asyncio.sleep(args.poll_interval)
+        response = await recorder.request(client, "GET /progress", "GET", f"/research/{session_id}/progress",
+                                          params={"summary": "true"})
+        response.raise_for_status()
+        status = response.json()["status"]
+        if status in TERMINAL_STATUSES:
+            break
+
+    response = await recorder.request(client, "GET /report", "GET", f"/research/{session_id}/report")
+    recorder.statuses[status] += 1
+    recorder.session_seconds.append(time.perf_counter() - started)
+
+
+async def run_workload(base_url: str, args) -> Dict[str, Any]:
+    recorder = Recorder()
+    next_index = iter(range(args.sessions))
+
+    async def client_loop(client: httpx.AsyncClient):
+        for index in next_index:
+            await run_session(client, recorder, index, args)
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*[client_loop(client) for _ in range(args.concurrency)])
+        elapsed = time.perf_counter() - started
+
+    return {
+        "sessions": len(recorder.session_seconds),
+        "elapsed_seconds": elapsed,
+        "sessions_per_minute": len(recorder.session_seconds) / elapsed * 60,
+        "statuses": dict(recorder.statuses),
+        "rejected_continues": recorder.rejected,
+        "session_seconds": summarize(recorder.session_seconds),
+        "endpoints": {label: summarize(samples) for label, samples in recorder.latencies.items()},
+    }
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {"n": len(samples), "p50": percentile(samples, 50), "p95": percentile(samples, 95),
+            "p99": percentile(samples, 99), "max": max(samples, default=0.0)}
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def print_results(results: Dict[str, Any]):
+    print(f"{results['sessions']} sessions in {results['elapsed_seconds']:.1f}s: "
+          f"{results['sessions_per_minute']:.1f} sessions/min, statuses {results['statuses']}, "
+          f"{results['rejected_continues']} /continue calls rejected with 429")
+    print(f"peak RSS {results['peak_rss_mb']:.1f} MB (after startup {results['startup_rss_mb']:.1f} MB)")
+    print(f"{'':<16} {'n':>6} {'p50':>10} {'p95':>10} {'p99':>10} {'max':>10}")
+    rows = [("session", results["session_seconds"]), *sorted(results["endpoints"].items())]
+    for label, stats in rows:
+        print(f"{label:<16} {stats['n']:>6} " + " ".join(
+            f"{stats[key] * 1000:>8.1f}ms" for key in ("p50", "p95", "p99", "max")))
+
+
+def regressions(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Metrics that got worse than the baseline by more than tolerance (a fraction)"""
+    found = []
+    if results["sessions_per_minute"] < baseline["sessions_per_minute"] * (1 - tolerance):
+        found.append(f"throughput {results['sessions_per_minute']:.1f} < "
+                     f"{baseline['sessions_per_minute']:.1f} sessions/min")
+    for label, stats in results["endpoints"].items():
+        before = baseline["endpoints"].get(label)
+        if before and stats["p95"] > before["p95"] * (1 + tolerance):
+            found.append(f"{label} p95 {stats['p95'] * 1000:.1f}ms > {before['p95'] * 1000:.1f}ms")
+    return found
+
+
+def main(args) -> int:
+    assistant_api = install_fakes(args)
+    with ServerThread(assistant_api.app) as base_url:
+        startup_rss = peak_rss_mb()
+        results = asyncio.run(run_workload(base_url, args))
+    results["startup_rss_mb"] = startup_rss
+    results["peak_rss_mb"] = peak_rss_mb()
+    results["settings"] = {key: value for key, value in vars(args).items() if key not in ("json", "baseline")}
+    print_results(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for regression in found:
+            print(f"REGRESSION: {regression}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20, help="number of sessions to run")
+    parser.add_argument("--concurrency", type=int, default=4, help="number of simulated clients")
+    parser.add_argument("--max-analysts", type=int, default=3)
+    parser.add_argument("--topic", default="The benefits of adopting LangGraph as an agent framework")
+    parser.add_argument("--topics", type=int, default=1000,
+                        help="number of distinct topics the sessions cycle through (fewer means more cache hits)")
+    parser.add_argument("--feedback-every", type=int, default=3,
+                        help="every Nth session sends analyst feedback before /continue (0: never)")
+    parser.add_argument("--poll-interval", type=float, default=0.2, help="seconds between /progress polls")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per fake model call")
+    parser.add_argument("--llm-tokens", type=int, default=200, help="words per fake model answer")
+    parser.add_argument("--search-latency", type=float, default=0.3, help="seconds per fake search")
+    parser.add_argument("--search-results", type=int, default=3, help="documents per fake search")
+    parser.add_argument("--search-result-chars", type=int, default=1500, help="characters per fake document")
+    parser.add_argument("--jitter", type=float, default=0.2, help="latency varies by +/- this fraction")
+    parser.add_argument("--durable", action="store_true",
+                        help="run with SESSION_STORE=sqlite (session, checkpoint and cache databases "
+                             "in a new temporary directory)")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="results file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression vs. the baseline")
+    sys.exit(main(parser.parse_args()))
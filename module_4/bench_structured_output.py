@@ -0,0 +1,51 @@
+"""
+Micro-benchmark: building model.with_structured_output(Schema) in every node call vs.
+reusing the runnable cached by structured_output().
+
+    python bench_structured_output.py --fanout 16 --calls 50
+
+Each of --fanout threads (like Send branches or parallel interviews) gets the structured
+runnable --calls times, as the nodes do once per invocation. No model is called; only
+building the runnable is timed.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# assistant.py asks for the API keys at import time; nothing is called here
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+
+from assistant import Perspectives, SearchQuery, model  # noqa: E402
+from structured_output import clear_structured_output_cache, structured_output  # noqa: E402
+
+
+def fan_out(get_runnable, schema, fanout: int, calls: int) -> float:
+    """Seconds per call when fanout threads each get the runnable calls times"""
+    def branch(_):
+        for _ in range(calls):
+            get_runnable(model, schema)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=fanout) as executor:
+        list(executor.map(branch, range(fanout)))
+    return (time.perf_counter() - started) / (fanout * calls)
+
+
+def main(fanout: int, calls: int):
+    print(f"{fanout} branches x {calls} calls")
+    print(f"{'schema':<14} {'rebuilt/call':>14} {'cached/call':>14} {'speedup':>10}")
+    for schema in (Perspectives, SearchQuery):
+        rebuilt = fan_out(lambda m, s: m.with_structured_output(s), schema, fanout, calls)
+        clear_structured_output_cache()
+        cached = fan_out(structured_output, schema, fanout, calls)
+        print(f"{schema.__name__:<14} {rebuilt * 1e6:>11.1f} us {cached * 1e6:>11.2f} us {rebuilt / cached:>9.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fanout", type=int, default=16, help="number of parallel branches")
+    parser.add_argument("--calls", type=int, default=50, help="node calls per branch")
+    args = parser.parse_args()
+    main(args.fanout, args.calls)
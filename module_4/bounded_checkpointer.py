@@ -0,0 +1,146 @@
+"""
+Memory-bounded checkpointer for long-running API processes.
+
+MemorySaver keeps every checkpoint of every thread for the lifetime of the process,
+so a server that creates new threads per session grows without limit.
+BoundedMemorySaver is a drop-in MemorySaver that:
+
+- expires threads not used for ttl_seconds,
+- evicts least recently used threads once the stored checkpoints exceed max_bytes,
+- can purge threads explicitly (e.g. every thread of a finished session),
+- reports its current footprint via stats().
+
+Sizes are the serialized bytes of checkpoints, metadata, channel blobs and pending
+writes, which is what MemorySaver actually holds.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.memory import MemorySaver
+
+
+def _serialized_size(value: Any) -> int:
+    """Total length of the bytes/str payloads inside a (possibly nested) tuple"""
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, tuple):
+        return sum(_serialized_size(item) for item in value)
+    return 0
+
+
+class BoundedMemorySaver(MemorySaver):
+    def __init__(self, *, ttl_seconds: Optional[float] = 3600, max_bytes: Optional[int] = 256 * 1024 * 1024,
+                 **kwargs):
+        super().__init__(**kwargs)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        # thread_id -> last access time, least recently used first
+        self._last_access: "OrderedDict[str, float]" = OrderedDict()
+        self._thread_bytes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._evicted_threads = 0
+        self._bookkeeping_lock = threading.RLock()
+
+    # -- reads: refresh the thread's position in the LRU order --------------------
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        self._touch(config["configurable"]["thread_id"])
+        return super().get_tuple(config)
+
+    def list(self, config: Optional[RunnableConfig], **kwargs) -> Iterator[CheckpointTuple]:
+        if config and config.get("configurable", {}).get("thread_id"):
+            self._touch(config["configurable"]["thread_id"])
+        return super().list(config, **kwargs)
+
+    # -- writes: account for the added bytes and enforce the limits ---------------
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        with self._bookkeeping_lock:
+            next_config = super().put(config, checkpoint, metadata, new_versions)
+            thread_id = next_config["configurable"]["thread_id"]
+            checkpoint_ns = next_config["configurable"]["checkpoint_ns"]
+            added = _serialized_size(self.storage[thread_id][checkpoint_ns][checkpoint["id"]])
+            added += sum(
+                _serialized_size(self.blobs.get((thread_id, checkpoint_ns, channel, version), ()))
+                for channel, version in new_versions.items()
+            )
+            self._account(thread_id, added)
+            self._enforce_limits(keep=thread_id)
+            return next_config
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[tuple], task_id: str,
+                   task_path: str = "") -> None:
+        with self._bookkeeping_lock:
+            thread_id = config["configurable"]["thread_id"]
+            outer_key = (thread_id, config["configurable"].get("checkpoint_ns", ""),
+                         config["configurable"]["checkpoint_id"])
+            before = _serialized_size(tuple(self.writes.get(outer_key, {}).values()))
+            super().put_writes(config, writes, task_id, task_path)
+            after = _serialized_size(tuple(self.writes.get(outer_key, {}).values()))
+            self._account(thread_id, after - before)
+            self._enforce_limits(keep=thread_id)
+
+    # -- purging ------------------------------------------------------------------
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._bookkeeping_lock:
+            super().delete_thread(thread_id)
+            self._total_bytes -= self._thread_bytes.pop(thread_id, 0)
+            self._last_access.pop(thread_id, None)
+
+    def purge_threads(self, prefix: str) -> int:
+        """Delete every thread whose id starts with prefix; returns the number deleted"""
+        with self._bookkeeping_lock:
+            thread_ids = [thread_id for thread_id in list(self.storage) if thread_id.startswith(prefix)]
+            for thread_id in thread_ids:
+                self.delete_thread(thread_id)
+            return len(thread_ids)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current memory footprint of the stored checkpoints"""
+        with self._bookkeeping_lock:
+            return {
+                "threads": len(self._last_access),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "evicted_threads": self._evicted_threads,
+            }
+
+    # -- internals ----------------------------------------------------------------
+
+    def _touch(self, thread_id: str):
+        with self._bookkeeping_lock:
+            self._last_access[thread_id] = time.monotonic()
+            self._last_access.move_to_end(thread_id)
+
+    def _account(self, thread_id: str, added_bytes: int):
+        self._thread_bytes[thread_id] = self._thread_bytes.get(thread_id, 0) + added_bytes
+        self._total_bytes += added_bytes
+        self._touch(thread_id)
+
+    def _evict(self, thread_id: str):
+        self.delete_thread(thread_id)
+        self._evicted_threads += 1
+
+    def _enforce_limits(self, keep: str):
+        """Expire idle threads, then evict LRU threads until under max_bytes (never `keep`)"""
+        if self.ttl_seconds is not None:
+            cutoff = time.monotonic() - self.ttl_seconds
+            for thread_id, last_access in list(self._last_access.items()):
+                if last_access >= cutoff:
+                    # ordered by last access, so every later thread is fresher
+                    break
+                if thread_id != keep:
+                    self._evict(thread_id)
+        if self.max_bytes is not None:
+            for thread_id in list(self._last_access):
+                if self._total_bytes <= self.max_bytes:
+                    break
+                if thread_id != keep:
+                    self._evict(thread_id)
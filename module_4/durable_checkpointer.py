@@ -0,0 +1,44 @@
+"""
+SQLite checkpointer for research jobs that must survive a restart.
+
+Interview and analyst graphs checkpointed here can be resumed by a new process from
+their last completed node. Adds the same purge_threads()/stats() helpers as
+BoundedMemorySaver so the API can treat both checkpointers alike.
+"""
+import os
+import sqlite3
+from typing import Any, Dict
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+
+class DurableSqliteSaver(SqliteSaver):
+    def __init__(self, path: str = "checkpoints.db"):
+        # check_same_thread=False is safe: SqliteSaver serializes access with its own lock
+        conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        super().__init__(conn)
+        self.path = path
+        self.setup()
+
+    def purge_threads(self, prefix: str) -> int:
+        """Delete every thread whose id starts with prefix; returns the number deleted"""
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        with self.cursor(transaction=False) as cur:
+            cur.execute("SELECT DISTINCT thread_id FROM checkpoints WHERE thread_id LIKE ? ESCAPE '\\'",
+                        (escaped + "%",))
+            thread_ids = [row[0] for row in cur.fetchall()]
+        for thread_id in thread_ids:
+            self.delete_thread(thread_id)
+        return len(thread_ids)
+
+    def stats(self) -> Dict[str, Any]:
+        """Number of checkpointed threads and size of the database file"""
+        with self.cursor(transaction=False) as cur:
+            cur.execute("SELECT COUNT(DISTINCT thread_id) FROM checkpoints")
+            threads = cur.fetchone()[0]
+        return {
+            "threads": threads,
+            "bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            "path": self.path,
+        }
@@ -0,0 +1,82 @@
+"""
+Compiled-graph registry.
+
+Compiling a StateGraph validates it and builds its channels and nodes, which is
+wasted work when the same graph is compiled again for every analyst of every
+session. get_compiled_graph() compiles each graph once per process for a given set
+of compile options and hands out the cached instance afterwards.
+
+Compiled graphs are safe to share: all per-run state lives in the checkpointer,
+keyed by the thread_id in the run config.
+"""
+import threading
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from assistant import (
+    StateGraph, GenerateAnalystsState, create_analysts, human_feedback, should_continue,
+    END, START, interview_builder, builder as research_builder
+)
+
+
+def build_analyst_graph() -> StateGraph:
+    """Analyst generation graph with a human feedback loop"""
+    builder = StateGraph(GenerateAnalystsState)
+    builder.add_node("create_analysts", create_analysts)
+    builder.add_node("human_feedback", human_feedback)
+    builder.add_edge(START, "create_analysts")
+    builder.add_edge("create_analysts", "human_feedback")
+    builder.add_conditional_edges("human_feedback", should_continue, ["create_analysts", END])
+    return builder
+
+
+# Graph name -> function returning its (uncompiled) builder
+GRAPH_BUILDERS: Dict[str, Callable[[], StateGraph]] = {
+    "analyst": build_analyst_graph,
+    "interview": lambda: interview_builder,
+    "research": lambda: research_builder,
+}
+
+_compiled_graphs: Dict[Tuple, Tuple[Any, Any]] = {}
+_lock = threading.Lock()
+
+
+def get_compiled_graph(name: str, checkpointer: Any = None, interrupt_before: Optional[Sequence[str]] = None,
+                       run_name: Optional[str] = None):
+    """
+    Return the compiled graph `name` for these compile options, compiling it on first use.
+
+    Args:
+        name: one of GRAPH_BUILDERS ("analyst", "interview", "research").
+        checkpointer: checkpointer to compile with; graphs compiled with different
+            checkpointer instances are cached separately.
+        interrupt_before: nodes to interrupt before.
+        run_name: optional run name applied with .with_config(run_name=...).
+    """
+    if name not in GRAPH_BUILDERS:
+        raise KeyError(f"Unknown graph: {name}")
+    key = (name, id(checkpointer) if checkpointer is not None else None,
+           tuple(interrupt_before or ()), run_name)
+
+    cached = _compiled_graphs.get(key)
+    if cached is not None:
+        return cached[0]
+
+    with _lock:
+        cached = _compiled_graphs.get(key)
+        if cached is None:
+            graph = GRAPH_BUILDERS[name]().compile(
+                checkpointer=checkpointer,
+                interrupt_before=list(interrupt_before) if interrupt_before else None
+            )
+            if run_name:
+                graph = graph.with_config(run_name=run_name)
+            # Keep a reference to the checkpointer so its id() cannot be reused by another object
+            cached = (graph, checkpointer)
+            _compiled_graphs[key] = cached
+    return cached[0]
+
+
+def clear_compiled_graphs():
+    """Drop every cached graph (e.g. after changing a builder)"""
+    with _lock:
+        _compiled_graphs.clear()
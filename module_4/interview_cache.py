@@ -0,0 +1,155 @@
+"""
+Cache of finished interviews, shared by every session in the process, or by every process.
+
+An interview depends only on the topic, the analyst persona and the number of turns. When
+analysts are regenerated after feedback, or another session researches the same topic,
+InterviewCache hands back the interviews of analysts that did not change, so only new or
+changed analysts are interviewed again. Entries are kept for ttl_seconds, at most
+max_entries of them, independently of how long sessions are kept.
+
+SQLiteInterviewCache keeps the interviews in a database file that every worker process
+(and the next process) shares.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from sqlite_connections import ThreadLocalConnections
+
+
+class InterviewCache:
+    def __init__(self, ttl_seconds: float = 24 * 3600, max_entries: int = 1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._interviews: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The unexpired interview cached under key, or None"""
+        if self.ttl_seconds <= 0:
+            return None
+        interview = self._lookup(key)
+        with self._lock:
+            if interview is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return interview
+
+    def put(self, key: str, interview: Dict[str, Any]):
+        """Cache a finished interview (a JSON-serializable dict) under key"""
+        if self.ttl_seconds > 0:
+            self._store(key, interview)
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            cached = self._interviews.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                self._interviews.move_to_end(key)
+                return cached[1]
+        return None
+
+    def _store(self, key: str, interview: Dict[str, Any]):
+        with self._lock:
+            self._interviews[key] = (time.monotonic() + self.ttl_seconds, interview)
+            self._interviews.move_to_end(key)
+            while len(self._interviews) > self.max_entries:
+                self._interviews.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._interviews), "hits": self.hits, "misses": self.misses,
+                    "ttl_seconds": self.ttl_seconds}
+
+    def clear(self):
+        with self._lock:
+            self._interviews.clear()
+
+
+class SQLiteInterviewCache(InterviewCache):
+    """InterviewCache in an SQLite database shared by processes"""
+
+    # Expired and surplus interviews are purged every this many stores
+    PURGE_EVERY = 100
+
+    def __init__(self, path: str = "interview_cache.db", ttl_seconds: float = 24 * 3600,
+                 max_entries: int = 100000):
+        super().__init__(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        self.path = path
+        self._connections = ThreadLocalConnections(path, pragmas=("journal_mode=WAL", "synchronous=NORMAL"))
+        self._stores = 0
+        self._connection().executescript("""
+            CREATE TABLE IF NOT EXISTS interviews (
+                key TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_interviews_expires ON interviews (expires_at);
+        """)
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT data FROM interviews WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _store(self, key: str, interview: Dict[str, Any]):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO interviews (key, data, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(interview, default=str), time.time() + self.ttl_seconds),
+        )
+        with self._lock:
+            self._stores += 1
+            purge = self._stores % self.PURGE_EVERY == 0
+        if purge:
+            self.purge()
+
+    def purge(self):
+        """Drop expired interviews and the oldest interviews beyond max_entries"""
+        self._connection().execute(
+            """DELETE FROM interviews WHERE expires_at <= ? OR rowid IN (
+                   SELECT rowid FROM interviews ORDER BY expires_at DESC LIMIT -1 OFFSET ?)""",
+            (time.time(), self.max_entries),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._connection().execute(
+            "SELECT COUNT(*) FROM interviews WHERE expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+        with self._lock:
+            return {"entries": entries, "hits": self.hits, "misses": self.misses, "ttl_seconds": self.ttl_seconds}
+
+    def clear(self):
+        self._connection().execute("DELETE FROM interviews")
+
+
+def create_interview_cache(kind: Optional[str] = None) -> InterviewCache:
+    """
+    Build the interview cache selected by INTERVIEW_CACHE.
+
+    Environment variables:
+        INTERVIEW_CACHE: "memory" or "sqlite" (default: "sqlite" with SESSION_STORE=sqlite, else "memory")
+        INTERVIEW_CACHE_DB_PATH: SQLite database file (default "interview_cache.db")
+        INTERVIEW_CACHE_TTL_SECONDS: seconds an interview is reused (default 86400, 0 disables reuse)
+        INTERVIEW_CACHE_MAX_ENTRIES: cached interviews kept (default 1000 in memory, 100000 in SQLite)
+    """
+    default_kind = "sqlite" if os.getenv("SESSION_STORE", "memory").lower() == "sqlite" else "memory"
+    kind = (kind or os.getenv("INTERVIEW_CACHE", default_kind)).lower()
+    ttl_seconds = float(os.getenv("INTERVIEW_CACHE_TTL_SECONDS", str(24 * 3600)))
+    if kind == "sqlite":
+        return SQLiteInterviewCache(os.getenv("INTERVIEW_CACHE_DB_PATH", "interview_cache.db"),
+                                    ttl_seconds=ttl_seconds,
+                                    max_entries=int(os.getenv("INTERVIEW_CACHE_MAX_ENTRIES", "100000")))
+    if kind == "memory":
+        return InterviewCache(ttl_seconds=ttl_seconds,
+                              max_entries=int(os.getenv("INTERVIEW_CACHE_MAX_ENTRIES", "1000")))
+    raise ValueError(f"Unknown INTERVIEW_CACHE: {kind}")
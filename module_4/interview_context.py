@@ -0,0 +1,107 @@
+"""
+Source documents gathered during an interview.
+
+Every search of every turn adds a block of formatted documents to InterviewState.context,
+and the same pages come back turn after turn. merge_context is the channel's reducer:
+it splits blocks into single documents and keeps each document once. select_context picks
+what goes into a prompt: the documents most relevant to the current question, up to a
+token budget, so prompt size stays bounded however many turns the interview has.
+"""
+import hashlib
+import math
+import re
+from collections import Counter
+from typing import List, Optional
+
+_DOCUMENT = re.compile(r"<Document\b.*?</Document>", re.S)
+_TERM = re.compile(r"\w{3,}")
+
+# Rough size of a token in characters; good enough to bound prompt size without a tokenizer
+CHARS_PER_TOKEN = 4
+
+
+def split_documents(block: str) -> List[str]:
+    """The <Document> elements of a formatted search result, or the block itself if it has none"""
+    documents = _DOCUMENT.findall(block or "")
+    if documents:
+        return documents
+    return [block] if block and block.strip() else []
+
+
+def _document_key(document: str) -> str:
+    return hashlib.sha1(" ".join(document.split()).encode()).hexdigest()
+
+
+def merge_context(existing: Optional[list], new: Optional[list]) -> list:
+    """Reducer of the context channel: append the documents of `new` not already in `existing`"""
+    merged = list(existing or [])
+    seen = {_document_key(document) for block in merged for document in split_documents(block)}
+    for block in new or []:
+        for document in split_documents(block):
+            key = _document_key(document)
+            if key not in seen:
+                seen.add(key)
+                merged.append(document)
+    return merged
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+SEPARATOR = "\n\n---\n\n"
+SEPARATOR_TOKENS = estimate_tokens(SEPARATOR)
+
+_CLOSING_TAG = "\n</Document>"
+
+
+def truncate_document(document: str, max_chars: int) -> str:
+    """The document cut to max_chars, keeping its closing </Document> tag"""
+    if len(document) <= max_chars:
+        return document
+    if document.endswith("</Document>") and max_chars > len(_CLOSING_TAG):
+        body = document[:-len("</Document>")].rstrip("\n")
+        return body[:max_chars - len(_CLOSING_TAG)] + _CLOSING_TAG
+    return document[:max_chars]
+
+
+def _terms(text: str) -> List[str]:
+    return _TERM.findall(text.lower())
+
+
+def select_context(context: list, query: str, max_tokens: Optional[int] = None) -> str:
+    """
+    The documents of `context` most relevant to `query` (by term overlap, weighted by how rare
+    a term is among the documents) joined for a prompt, best first, within max_tokens. The
+    best document is cut to fit if it alone is larger; None or 0 means no limit.
+    """
+    documents = [document for block in context or [] for document in split_documents(block)]
+    if not documents:
+        return ""
+    query_terms = set(_terms(query))
+    document_terms = [Counter(_terms(document)) for document in documents]
+    document_frequency = Counter(term for terms in document_terms for term in terms.keys() & query_terms)
+
+    def score(index: int) -> float:
+        terms = document_terms[index]
+        return sum(
+            math.log(1 + terms[term]) * math.log(1 + len(documents) / document_frequency[term])
+            for term in query_terms if terms[term]
+        )
+
+    # Equally relevant documents keep the order they were found in
+    ranked = sorted(range(len(documents)), key=lambda index: (-score(index), index))
+    selected, used = [], 0
+    for index in ranked:
+        document = documents[index]
+        # Separators count against the budget too; summed estimates never undercount the whole
+        tokens = estimate_tokens(document) + (SEPARATOR_TOKENS if selected else 0)
+        if max_tokens and used + tokens > max_tokens:
+            if not selected:
+                # Nothing fits yet: the best document, cut to the whole budget
+                selected.append(truncate_document(document, max_tokens * CHARS_PER_TOKEN))
+                break
+            continue
+        selected.append(document)
+        used += tokens
+    return SEPARATOR.join(selected)
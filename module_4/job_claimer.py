@@ -0,0 +1,100 @@
+"""
+Claims research jobs from the shared job table for one worker process.
+
+With several API worker processes, /continue only records a job in the shared
+SQLiteJobStore. Every worker runs a JobClaimer: a background thread that, whenever
+the worker's own JobScheduler has a free slot, claims the next job from the table
+(so each job runs on exactly one worker) and hands it to the scheduler. The same loop
+keeps the lease on the worker's running jobs alive and forwards cancel requests made
+on other workers to the local jobs.
+"""
+import os
+import socket
+import threading
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from job_scheduler import JobScheduler
+from job_store import SQLiteJobStore
+
+
+def new_worker_id() -> str:
+    """Id unique to this process, readable enough to tell workers apart in the job table"""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class JobClaimer:
+    def __init__(self, store: SQLiteJobStore, scheduler: JobScheduler,
+                 start_job: Callable[[Dict[str, Any]], None],
+                 on_cancel_requested: Optional[Callable[[str, str], None]] = None,
+                 worker_id: Optional[str] = None, poll_seconds: float = 1.0, lease_seconds: float = 30.0):
+        """
+        Args:
+            store: the shared job table.
+            scheduler: this worker's scheduler; jobs are only claimed while it has a free worker.
+            start_job: called with each claimed job; expected to submit it to the scheduler.
+            on_cancel_requested: called with (session_id, reason) for running jobs of this
+                worker that another worker asked to cancel.
+            worker_id: id recorded on claimed jobs (default: new_worker_id()).
+            poll_seconds: how often the table is checked for jobs and the leases are renewed.
+            lease_seconds: a running job whose worker has not renewed its lease for this long
+                is considered abandoned and may be claimed again.
+        """
+        self.store = store
+        self.scheduler = scheduler
+        self.start_job = start_job
+        self.on_cancel_requested = on_cancel_requested
+        self.worker_id = worker_id or new_worker_id()
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="job-claimer", daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Check for jobs now instead of at the next poll (e.g. right after queueing one)"""
+        self._wakeup.set()
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Stop the loop. Leases of running jobs are no longer renewed either, so stop it only
+        after they finished or were released; closing the scheduler alone stops new claims.
+        """
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def claim_available(self) -> int:
+        """Claim jobs while this worker has free capacity; returns the number claimed"""
+        claimed = 0
+        while not self._stopped.is_set() and not self.scheduler.closed and self._has_capacity():
+            job = self.store.claim(self.worker_id, self.lease_seconds)
+            if job is None:
+                break
+            self.start_job(job)
+            claimed += 1
+        return claimed
+
+    def _has_capacity(self) -> bool:
+        stats = self.scheduler.stats()
+        return stats["running"] + stats["queued"] < stats["workers"]
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.clear()
+            try:
+                cancel_requests = self.store.heartbeat(self.worker_id)
+                if self.on_cancel_requested:
+                    for session_id, reason in cancel_requests.items():
+                        self.on_cancel_requested(session_id, reason)
+                self.claim_available()
+            except Exception:
+                # A locked or briefly unavailable database is retried at the next poll
+                pass
+            self._wakeup.wait(self.poll_seconds)
@@ -0,0 +1,186 @@
+"""
+Bounded background job scheduler for the research API.
+
+A fixed pool of worker threads pulls jobs from a FIFO queue with a maximum depth.
+When the queue is full new jobs are rejected (QueueFullError) instead of piling up,
+so a burst of /continue requests cannot launch an unbounded number of interview
+pipelines at once.
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at its maximum depth"""
+
+
+class SchedulerClosedError(Exception):
+    """Raised when a job is submitted after the scheduler was shut down"""
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when its cancellation token was cancelled or its deadline passed"""
+
+
+class CancellationToken:
+    """
+    Cooperative cancellation for a running job.
+
+    Jobs call raise_if_cancelled() between units of work (e.g. between graph nodes);
+    it raises JobCancelled once cancel() was called or the optional deadline passed.
+    """
+
+    def __init__(self, deadline_seconds: Optional[float] = None):
+        self.deadline = time.monotonic() + deadline_seconds if deadline_seconds else None
+        self._event = threading.Event()
+        self._reason: Optional[str] = None
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self._event.is_set():
+            self._reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        if not self._event.is_set() and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("deadline_exceeded")
+        return self._event.is_set()
+
+    @property
+    def reason(self) -> Optional[str]:
+        return self._reason if self.cancelled else None
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise JobCancelled(self._reason)
+
+
+class JobScheduler:
+    def __init__(self, max_workers: int = 2, max_queue_depth: int = 10, name: str = "job"):
+        self.max_workers = max(1, max_workers)
+        self.max_queue_depth = max(0, max_queue_depth)
+        self._queue: Deque[Tuple[str, Callable[..., Any], tuple, dict]] = deque()
+        self._running: Set[str] = set()
+        self._condition = threading.Condition()
+        self._shutdown = False
+        self._workers = [
+            threading.Thread(target=self._worker_loop, name=f"{name}-worker-{i}", daemon=True)
+            for i in range(self.max_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, job_id: str, func: Callable[..., Any], *args, enforce_depth: bool = True, **kwargs) -> int:
+        """
+        Queue a job and return its 1-based queue position.
+
+        enforce_depth=False admits the job even when the queue is full (used to re-queue
+        jobs that were already admitted before a restart).
+
+        Raises:
+            QueueFullError: if the queue already holds max_queue_depth jobs.
+            SchedulerClosedError: if the scheduler was shut down.
+            ValueError: if a job with the same id is already queued or running.
+        """
+        with self._condition:
+            if self._shutdown:
+                raise SchedulerClosedError("Scheduler is shut down")
+            if self._is_active(job_id):
+                raise ValueError(f"Job {job_id} is already scheduled")
+            if enforce_depth and len(self._queue) >= self.max_queue_depth:
+                raise QueueFullError(
+                    f"Job queue is full ({len(self._queue)}/{self.max_queue_depth} waiting)"
+                )
+            self._queue.append((job_id, func, args, kwargs))
+            self._condition.notify()
+            return len(self._queue)
+
+    def cancel(self, job_id: str) -> bool:
+        """Remove a waiting job from the queue; returns False if it is not waiting"""
+        with self._condition:
+            for entry in self._queue:
+                if entry[0] == job_id:
+                    self._queue.remove(entry)
+                    return True
+        return False
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """1-based position of a waiting job, or None if it is not waiting"""
+        with self._condition:
+            for position, (queued_id, *_rest) in enumerate(self._queue, start=1):
+                if queued_id == job_id:
+                    return position
+        return None
+
+    def is_running(self, job_id: str) -> bool:
+        with self._condition:
+            return job_id in self._running
+
+    def is_active(self, job_id: str) -> bool:
+        """True if the job is waiting in the queue or currently running"""
+        with self._condition:
+            return self._is_active(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {
+                "workers": self.max_workers,
+                "running": len(self._running),
+                "queued": len(self._queue),
+                "max_queue_depth": self.max_queue_depth,
+            }
+
+    @property
+    def closed(self) -> bool:
+        return self._shutdown
+
+    def running_jobs(self) -> List[str]:
+        with self._condition:
+            return list(self._running)
+
+    def shutdown(self, wait: bool = True, timeout: Optional[float] = None, cancel_queued: bool = False) -> List[str]:
+        """
+        Stop accepting jobs; workers finish their current job and exit.
+
+        Without cancel_queued the workers first drain what is already queued. With it,
+        queued jobs are dropped instead and their ids returned.
+        """
+        with self._condition:
+            self._shutdown = True
+            dropped = [job_id for job_id, *_rest in self._queue] if cancel_queued else []
+            if cancel_queued:
+                self._queue.clear()
+            self._condition.notify_all()
+        if wait:
+            self.join(timeout)
+        return dropped
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait up to timeout seconds in total for the workers to exit; True if they all did"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        for worker in self._workers:
+            worker.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        return not any(worker.is_alive() for worker in self._workers)
+
+    def _is_active(self, job_id: str) -> bool:
+        return job_id in self._running or any(queued_id == job_id for queued_id, *_rest in self._queue)
+
+    def _worker_loop(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._shutdown:
+                    self._condition.wait()
+                if self._shutdown and not self._queue:
+                    return
+                job_id, func, args, kwargs = self._queue.popleft()
+                self._running.add(job_id)
+            try:
+                func(*args, **kwargs)
+            except Exception:
+                # Jobs record their own errors; a failing job must not kill the worker
+                pass
+            finally:
+                with self._condition:
+                    self._running.discard(job_id)
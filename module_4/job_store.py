@@ -0,0 +1,192 @@
+"""
+Durable, shared table of research jobs.
+
+Every job queued by /continue is recorded here until it finishes. The table is also the
+job queue shared by every API worker process: workers claim queued jobs one at a time
+(an atomic update, so each job is run by exactly one worker) and keep a heartbeat on the
+jobs they run. A job whose worker stopped heartbeating, e.g. because the process crashed,
+can be claimed again by any worker; together with the durable checkpointer it then
+resumes from its last completed interview step.
+"""
+import json
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+
+from job_scheduler import QueueFullError
+from sqlite_connections import ThreadLocalConnections
+
+# queued -> running -> finished (running jobs go back to queued when their worker releases them)
+QUEUED, RUNNING, FINISHED = "queued", "running", "finished"
+
+_JOB_COLUMNS = "session_id, state, params, attempts, worker_id, cancel_reason"
+
+
+class SQLiteJobStore:
+    def __init__(self, path: str = "sessions.db"):
+        self.path = path
+        self._connections = ThreadLocalConnections(path)
+        conn = self._connection()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS research_jobs (
+                session_id TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                params TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_research_jobs_state ON research_jobs (state, created_at);
+        """)
+        # Columns added for multi-worker claims; older databases get them on first use
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(research_jobs)")}
+        for column, definition in (("worker_id", "TEXT"), ("heartbeat_at", "REAL"), ("cancel_reason", "TEXT")):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE research_jobs ADD COLUMN {column} {definition}")
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def record(self, session_id: str, params: Dict[str, Any], max_queued: Optional[int] = None) -> int:
+        """
+        Queue a job (replacing a finished job of the same session) and return its 1-based
+        queue position.
+
+        Raises:
+            QueueFullError: if max_queued jobs are already waiting.
+        """
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            queued = conn.execute("SELECT COUNT(*) FROM research_jobs WHERE state = ?", (QUEUED,)).fetchone()[0]
+            if max_queued is not None and queued >= max_queued:
+                raise QueueFullError(f"Job queue is full ({queued}/{max_queued} waiting)")
+            conn.execute(
+                """INSERT OR REPLACE INTO research_jobs
+                       (session_id, state, params, attempts, created_at, updated_at, worker_id, heartbeat_at, cancel_reason)
+                   VALUES (?, ?, ?, 0, ?, ?, NULL, NULL, NULL)""",
+                (session_id, QUEUED, json.dumps(params), now, now),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return queued + 1
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        Claim the oldest queued job, or a running job whose worker has not sent a heartbeat
+        for lease_seconds, for worker_id. Returns the claimed job or None.
+        """
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                f"""SELECT {_JOB_COLUMNS} FROM research_jobs
+                    WHERE state = ? OR (state = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?))
+                    ORDER BY created_at LIMIT 1""",
+                (QUEUED, RUNNING, now - lease_seconds),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    """UPDATE research_jobs SET state = ?, worker_id = ?, heartbeat_at = ?, updated_at = ?,
+                           attempts = attempts + 1 WHERE session_id = ?""",
+                    (RUNNING, worker_id, now, now, row[0]),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        job = self._to_job(row)
+        job["attempts"] += 1
+        job["state"], job["worker_id"] = RUNNING, worker_id
+        return job
+
+    def heartbeat(self, worker_id: str) -> Dict[str, str]:
+        """
+        Extend the lease on every job worker_id is running. Returns {session_id: reason} for
+        those of its jobs that were asked to cancel.
+        """
+        conn = self._connection()
+        conn.execute(
+            "UPDATE research_jobs SET heartbeat_at = ? WHERE worker_id = ? AND state = ?",
+            (time.time(), worker_id, RUNNING),
+        )
+        rows = conn.execute(
+            "SELECT session_id, cancel_reason FROM research_jobs WHERE worker_id = ? AND state = ? "
+            "AND cancel_reason IS NOT NULL",
+            (worker_id, RUNNING),
+        ).fetchall()
+        return dict(rows)
+
+    def request_cancel(self, session_id: str, reason: str = "cancelled") -> bool:
+        """Ask the worker running a job to cancel it; False if the job is not running"""
+        cursor = self._connection().execute(
+            "UPDATE research_jobs SET cancel_reason = ?, updated_at = ? WHERE session_id = ? AND state = ?",
+            (reason, time.time(), session_id, RUNNING),
+        )
+        return cursor.rowcount > 0
+
+    def cancel_queued(self, session_id: str) -> bool:
+        """Finish a job that no worker has claimed yet; False if it is not queued"""
+        cursor = self._connection().execute(
+            "UPDATE research_jobs SET state = ?, cancel_reason = ?, updated_at = ? WHERE session_id = ? AND state = ?",
+            (FINISHED, "cancelled", time.time(), session_id, QUEUED),
+        )
+        return cursor.rowcount > 0
+
+    def release(self, session_id: str, worker_id: str):
+        """Put a job worker_id is running back in the queue (e.g. on shutdown) so another worker resumes it"""
+        self._connection().execute(
+            """UPDATE research_jobs SET state = ?, worker_id = NULL, heartbeat_at = NULL, updated_at = ?
+               WHERE session_id = ? AND state = ? AND worker_id = ?""",
+            (QUEUED, time.time(), session_id, RUNNING, worker_id),
+        )
+
+    def finish(self, session_id: str):
+        self._connection().execute(
+            "UPDATE research_jobs SET state = ?, updated_at = ? WHERE session_id = ?",
+            (FINISHED, time.time(), session_id),
+        )
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            f"SELECT {_JOB_COLUMNS} FROM research_jobs WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return self._to_job(row) if row else None
+
+    def is_active(self, session_id: str) -> bool:
+        """True if the job is queued or running on any worker"""
+        job = self.get(session_id)
+        return job is not None and job["state"] != FINISHED
+
+    def queue_position(self, session_id: str) -> Optional[int]:
+        """1-based position of a queued job among all queued jobs, or None if it is not queued"""
+        row = self._connection().execute(
+            """SELECT COUNT(*) FROM research_jobs
+               WHERE state = ? AND created_at <= (SELECT created_at FROM research_jobs WHERE session_id = ? AND state = ?)""",
+            (QUEUED, session_id, QUEUED),
+        ).fetchone()
+        return row[0] or None
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs in each state"""
+        rows = self._connection().execute("SELECT state, COUNT(*) FROM research_jobs GROUP BY state").fetchall()
+        return dict(rows)
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        """Queued or running jobs, oldest first"""
+        rows = self._connection().execute(
+            f"SELECT {_JOB_COLUMNS} FROM research_jobs WHERE state != ? ORDER BY created_at",
+            (FINISHED,),
+        ).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    @staticmethod
+    def _to_job(row) -> Dict[str, Any]:
+        return {"session_id": row[0], "state": row[1], "params": json.loads(row[2]), "attempts": row[3],
+                "worker_id": row[4], "cancel_reason": row[5]}
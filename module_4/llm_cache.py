@@ -0,0 +1,204 @@
+"""
+LLM response cache shared by the sessions of a batch, in the process or across processes.
+
+Sessions of one batch send some identical prompts: analysts of repeated topics, questions
+of the same persona, merges of the same memos. LLMCache is a LangChain cache, set as the
+`cache` of the model copy batch runs use (see assistant.shared_cache_model), so an identical
+prompt sent with identical model settings is answered from the cache instead of by the
+provider. Other sessions never read it: a re-run or repeated feedback gets a fresh
+generation. The cache is off unless LLM_CACHE enables it.
+
+Cached responses report zero token usage and carry response_metadata["cached"] = True, so
+run budgets and token metrics only count what the provider actually processed, as with
+search cache hits.
+
+SQLiteLLMCache keeps the responses in a database file that every worker process (and the
+next process) shares.
+"""
+import copy
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import ChatGeneration
+
+from sqlite_connections import ThreadLocalConnections
+
+# loads() warns that it is in beta on first use; the cache only reads what dumps() wrote
+warnings.filterwarnings("ignore", message="The function `loads` is in beta")
+
+
+def is_cached(response: Any) -> bool:
+    """Whether an LLMResult was answered from the cache"""
+    generations = [generation for batch in response.generations for generation in batch]
+    return bool(generations) and all(
+        (getattr(getattr(generation, "message", None), "response_metadata", None) or {}).get("cached")
+        for generation in generations
+    )
+
+
+def _as_cache_hit(generations: Sequence[Any]) -> RETURN_VAL_TYPE:
+    """Copies of cached generations marked as cache hits, with no token usage"""
+    hits = []
+    for generation in copy.deepcopy(list(generations)):
+        if isinstance(generation, ChatGeneration):
+            message = generation.message.model_copy(update={
+                "response_metadata": {**generation.message.response_metadata, "cached": True},
+            })
+            if getattr(message, "usage_metadata", None):
+                message.usage_metadata = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+            generation = generation.model_copy(update={"message": message})
+        hits.append(generation)
+    return hits
+
+
+class LLMCache(BaseCache):
+    def __init__(self, ttl_seconds: float = 3600, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._responses: "OrderedDict[Tuple[str, str], Tuple[float, RETURN_VAL_TYPE]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        if self.ttl_seconds <= 0:
+            return None
+        found = self._lookup((prompt, llm_string))
+        with self._lock:
+            if found is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return _as_cache_hit(found)
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE):
+        if self.ttl_seconds > 0:
+            self._store((prompt, llm_string), return_val)
+
+    def _lookup(self, key: Tuple[str, str]) -> Optional[RETURN_VAL_TYPE]:
+        with self._lock:
+            cached = self._responses.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                self._responses.move_to_end(key)
+                return cached[1]
+        return None
+
+    def _store(self, key: Tuple[str, str], return_val: RETURN_VAL_TYPE):
+        with self._lock:
+            # A copy: callers own (and may change, e.g. a message's name) what the model returned
+            self._responses[key] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(list(return_val)))
+            self._responses.move_to_end(key)
+            while len(self._responses) > self.max_entries:
+                self._responses.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._responses), "hits": self.hits, "misses": self.misses,
+                    "ttl_seconds": self.ttl_seconds}
+
+    def clear(self, **kwargs: Any):
+        with self._lock:
+            self._responses.clear()
+
+
+def _key_hash(key: Tuple[str, str]) -> str:
+    return hashlib.sha256("\0".join(key).encode()).hexdigest()
+
+
+class SQLiteLLMCache(LLMCache):
+    """LLMCache in an SQLite database shared by processes"""
+
+    # Expired and surplus responses are purged every this many stores
+    PURGE_EVERY = 100
+
+    def __init__(self, path: str = "llm_cache.db", ttl_seconds: float = 3600, max_entries: int = 100000):
+        super().__init__(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        self.path = path
+        self._connections = ThreadLocalConnections(path, pragmas=("journal_mode=WAL", "synchronous=NORMAL"))
+        self._stores = 0
+        self._connection().executescript("""
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                generations TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_llm_responses_expires ON llm_responses (expires_at);
+        """)
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def _lookup(self, key: Tuple[str, str]) -> Optional[RETURN_VAL_TYPE]:
+        row = self._connection().execute(
+            "SELECT generations FROM llm_responses WHERE key = ? AND expires_at > ?", (_key_hash(key), time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            return loads(row[0])
+        except Exception:
+            # Written by an incompatible langchain version; answered by the model again
+            return None
+
+    def _store(self, key: Tuple[str, str], return_val: RETURN_VAL_TYPE):
+        try:
+            generations = dumps(list(return_val))
+        except (TypeError, ValueError):
+            return
+        self._connection().execute(
+            "INSERT OR REPLACE INTO llm_responses (key, generations, expires_at) VALUES (?, ?, ?)",
+            (_key_hash(key), generations, time.time() + self.ttl_seconds),
+        )
+        with self._lock:
+            self._stores += 1
+            purge = self._stores % self.PURGE_EVERY == 0
+        if purge:
+            self.purge()
+
+    def purge(self):
+        """Drop expired responses and the oldest responses beyond max_entries"""
+        self._connection().execute(
+            """DELETE FROM llm_responses WHERE expires_at <= ? OR rowid IN (
+                   SELECT rowid FROM llm_responses ORDER BY expires_at DESC LIMIT -1 OFFSET ?)""",
+            (time.time(), self.max_entries),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._connection().execute(
+            "SELECT COUNT(*) FROM llm_responses WHERE expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+        with self._lock:
+            return {"entries": entries, "hits": self.hits, "misses": self.misses, "ttl_seconds": self.ttl_seconds}
+
+    def clear(self, **kwargs: Any):
+        self._connection().execute("DELETE FROM llm_responses")
+
+
+def create_llm_cache(kind: Optional[str] = None) -> Optional[LLMCache]:
+    """
+    Build the LLM response cache selected by LLM_CACHE; None when it is disabled.
+
+    Environment variables:
+        LLM_CACHE: "none" (default), "memory" or "sqlite"
+        LLM_CACHE_DB_PATH: SQLite database file (default "llm_cache.db")
+        LLM_CACHE_TTL_SECONDS: seconds a response is reused (default 3600, 0 disables the cache)
+        LLM_CACHE_MAX_ENTRIES: cached responses kept (default 1024 in memory, 100000 in SQLite)
+    """
+    kind = (kind or os.getenv("LLM_CACHE", "none")).lower()
+    ttl_seconds = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+    if kind == "none" or ttl_seconds <= 0:
+        return None
+    if kind == "sqlite":
+        return SQLiteLLMCache(os.getenv("LLM_CACHE_DB_PATH", "llm_cache.db"), ttl_seconds=ttl_seconds,
+                              max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "100000")))
+    if kind == "memory":
+        return LLMCache(ttl_seconds=ttl_seconds, max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024")))
+    raise ValueError(f"Unknown LLM_CACHE: {kind}")
@@ -0,0 +1,97 @@
+"""
+Load test: /progress latency while analyst generation is in flight.
+
+Start the API first (python assistant_api.py), then run:
+
+    python load_test_progress.py --base-url http://localhost:8000 --starts 8
+
+The script creates one session to poll, then fires N concurrent POST /research/start
+calls and keeps polling GET /research/{session_id}/progress in parallel. It prints the
+p50/p95/p99 latency of /progress while the /start calls are idle vs. running, so you can
+check that slow Gemini calls no longer block the event loop.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+import httpx
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def report(label: str, samples: List[float]):
+    print(f"{label:<28} n={len(samples):<5} "
+          f"p50={percentile(samples, 50) * 1000:7.1f}ms "
+          f"p95={percentile(samples, 95) * 1000:7.1f}ms "
+          f"p99={percentile(samples, 99) * 1000:7.1f}ms "
+          f"max={max(samples, default=0) * 1000:7.1f}ms")
+
+
+async def poll_progress(client: httpx.AsyncClient, session_id: str, stop: asyncio.Event,
+                        interval: float) -> List[float]:
+    """Poll the progress endpoint until stop is set and return the latencies"""
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get(f"/research/{session_id}/progress")
+        latencies.append(time.perf_counter() - started)
+        response.raise_for_status()
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def start_session(client: httpx.AsyncClient, topic: str, max_analysts: int) -> float:
+    started = time.perf_counter()
+    response = await client.post("/research/start", json={"topic": topic, "max_analysts": max_analysts})
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+async def main(args):
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as client:
+        # Session whose progress we poll during the test
+        response = await client.post("/research/start", json={"topic": args.topic, "max_analysts": 1})
+        response.raise_for_status()
+        session_id = response.json()["session_id"]
+
+        # Baseline: nothing else running
+        stop = asyncio.Event()
+        baseline_task = asyncio.create_task(poll_progress(client, session_id, stop, args.interval))
+        await asyncio.sleep(args.baseline_seconds)
+        stop.set()
+        baseline = await baseline_task
+
+        # Under load: N concurrent /start calls
+        stop = asyncio.Event()
+        poll_task = asyncio.create_task(poll_progress(client, session_id, stop, args.interval))
+        start_latencies = await asyncio.gather(*[
+            start_session(client, f"{args.topic} #{i}", args.max_analysts) for i in range(args.starts)
+        ])
+        stop.set()
+        under_load = await poll_task
+
+    print(f"{args.starts} concurrent /research/start calls, "
+          f"mean {statistics.mean(start_latencies):.2f}s each")
+    report("/progress (idle)", baseline)
+    report("/progress (during /start)", under_load)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--starts", type=int, default=8, help="number of concurrent /research/start calls")
+    parser.add_argument("--max-analysts", type=int, default=3)
+    parser.add_argument("--topic", default="The benefits of adopting LangGraph as an agent framework")
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between /progress polls")
+    parser.add_argument("--baseline-seconds", type=float, default=3.0)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    asyncio.run(main(parser.parse_args()))
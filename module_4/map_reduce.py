@@ -9,6 +9,8 @@ from langgraph.graph import END, START, StateGraph
 from langgraph.types import Send
 from pydantic import BaseModel
 
+from structured_output import structured_output
+
 
 def _set_env(var: str):
     if not os.environ.get(var):
@@ -55,7 +57,7 @@ class overallState(TypedDict):
 # node to generate the subjects for topic
 def generate_topics(state: overallState):
     prompt = subjects_prompt.format(topic=state["topic"])
-    response = model.with_structured_output(Subjects).invoke(prompt)
+    response = structured_output(model, Subjects).invoke(prompt)
     return {"subjects": response.subjects}
 
 # Here is the magic: we use the Send to create a joke for each subject.
@@ -81,7 +83,7 @@ class Joke(BaseModel):
 
 def generate_joke(state:jokeState):
     prompt = joke_prompt.format(subject=state["subject"])
-    response = model.with_structured_output(Joke).invoke(prompt)
+    response = structured_output(model, Joke).invoke(prompt)
     return {"jokes": [response.joke]}
 
 ###############
@@ -90,7 +92,7 @@ def generate_joke(state:jokeState):
 def best_joke(state: overallState):
     jokes = "\n\n".join(state["jokes"])
     prompt = best_joke_prompt.format(topic=state["topic"], jokes=jokes)
-    response = model.with_structured_output(BestJoke).invoke(prompt)
+    response = structured_output(model, BestJoke).invoke(prompt)
     return {"best_selected_joke": state["jokes"][response.id]}
 
 # graph building and compiling
@@ -0,0 +1,235 @@
+"""
+Minimal Prometheus-style metrics for the research pipeline.
+
+Counters, gauges and histograms with labels, rendered in the Prometheus text
+exposition format by MetricsRegistry.render() (served by GET /metrics). Values are
+per process; with several API workers each worker reports its own.
+
+NodeMetricsCallbackHandler is a LangChain callback that records, for every graph
+node, how long it took, whether it failed, and how many LLM calls and tokens it used.
+Pass it in the `callbacks` of a graph's run config.
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from llm_cache import is_cached
+
+# Seconds; covers quick cache hits up to long LLM calls
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """The metric's sample lines in the text format"""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the duration of the with-block, also when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                for bound, bucket_count in [*zip(self.buckets, counts), ("+Inf", count)]:
+                    le = f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {bucket_count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+# Process-wide registry and the pipeline metrics recorded into it
+registry = MetricsRegistry()
+node_duration = registry.histogram("research_node_duration_seconds", "Duration of graph node runs", ["node"])
+node_errors = registry.counter("research_node_errors_total", "Graph node runs that raised", ["node"])
+llm_calls = registry.counter("research_llm_calls_total", "LLM calls by the node that made them", ["node"])
+llm_tokens = registry.counter("research_llm_tokens_total", "LLM tokens by node and direction", ["node", "type"])
+search_duration = registry.histogram("research_search_duration_seconds",
+                                     "Duration of search backend requests (cache misses)", ["source"])
+search_requests = registry.counter("research_search_requests_total",
+                                   "Searches by source, including those answered from the cache", ["source"])
+
+
+class NodeMetricsCallbackHandler(BaseCallbackHandler):
+    """Records node duration/errors and per-node LLM calls and token usage from LangChain callbacks"""
+
+    def __init__(self):
+        # run_id -> (node, start time) for node runs in progress; run_id -> node for LLM runs
+        self._node_runs: Dict[UUID, Tuple[str, float]] = {}
+        self._llm_runs: Dict[UUID, str] = {}
+        self._lock = threading.Lock()
+
+    def on_chain_start(self, serialized: Optional[Dict[str, Any]], inputs: Any, *, run_id: UUID,
+                       metadata: Optional[Dict[str, Any]] = None, **kwargs: Any):
+        node = (metadata or {}).get("langgraph_node")
+        # Runnables inside a node inherit its metadata; only the node's own run has its name
+        if node and kwargs.get("name") == node:
+            with self._lock:
+                self._node_runs[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any):
+        self._finish_node(run_id, failed=False)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._finish_node(run_id, failed=True)
+
+    def on_chat_model_start(self, serialized: Optional[Dict[str, Any]], messages: Any, *, run_id: UUID,
+                            metadata: Optional[Dict[str, Any]] = None, **kwargs: Any):
+        self._start_llm(run_id, metadata)
+
+    def on_llm_start(self, serialized: Optional[Dict[str, Any]], prompts: Any, *, run_id: UUID,
+                     metadata: Optional[Dict[str, Any]] = None, **kwargs: Any):
+        self._start_llm(run_id, metadata)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any):
+        with self._lock:
+            node = self._llm_runs.pop(run_id, None)
+        if node is None or is_cached(response):
+            # Answers from the shared LLM cache are neither calls to the provider nor tokens
+            return
+        llm_calls.inc(node=node)
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                if usage:
+                    llm_tokens.inc(usage.get("input_tokens", 0), node=node, type="input")
+                    llm_tokens.inc(usage.get("output_tokens", 0), node=node, type="output")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        with self._lock:
+            node = self._llm_runs.pop(run_id, None)
+        if node is not None:
+            llm_calls.inc(node=node)
+
+    def _start_llm(self, run_id: UUID, metadata: Optional[Dict[str, Any]]):
+        with self._lock:
+            self._llm_runs[run_id] = (metadata or {}).get("langgraph_node") or (metadata or {}).get("metrics_node") or "other"
+
+    def _finish_node(self, run_id: UUID, failed: bool):
+        with self._lock:
+            entry = self._node_runs.pop(run_id, None)
+        if entry is None:
+            return
+        node, start = entry
+        node_duration.observe(time.perf_counter() - start, node=node)
+        if failed:
+            node_errors.inc(node=node)
+
+
+# Shared handler; add it to the callbacks of graph runs
+node_metrics = NodeMetricsCallbackHandler()
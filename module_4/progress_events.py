@@ -0,0 +1,283 @@
+"""
+Per-session progress event log for the research API.
+
+Background research jobs publish small, incremental events (analyst started,
+interview finished, section ready, ...) from worker threads. Each event gets a
+sequence id that is increasing per session, so clients can resume from the last
+id they saw. Subscribers living on an asyncio event loop are woken up as soon as
+a new event is published, which is what the server-sent-events endpoint uses to
+push updates instead of having clients poll.
+
+SQLiteProgressEventLog has the same interface but keeps the events in SQLite, so
+that several API worker processes share them.
+
+Events are not kept forever: those of a session that finished are dropped
+retention_seconds later (long enough for clients to read the last ones), and
+events older than max_age_seconds are dropped whatever the session's state.
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from sqlite_connections import ThreadLocalConnections
+
+
+class _EventRetention(ABC):
+    """Drops the events of finished sessions after retention_seconds, and all events after max_age_seconds"""
+
+    # Finished sessions and old events are checked for at most this often, on publish
+    SWEEP_SECONDS = 10.0
+
+    def __init__(self, retention_seconds: float, max_age_seconds: Optional[float]):
+        self.retention_seconds = retention_seconds
+        self.max_age_seconds = max_age_seconds
+        self._drop_at: Dict[str, float] = {}
+        self._next_sweep = 0.0
+        self._retention_lock = threading.Lock()
+
+    def finish(self, session_id: str):
+        """The session reached a final status: drop its events retention_seconds from now"""
+        with self._retention_lock:
+            self._drop_at[session_id] = time.monotonic() + self.retention_seconds
+
+    def _unschedule(self, session_id: str):
+        with self._retention_lock:
+            self._drop_at.pop(session_id, None)
+
+    def _published(self, session_id: str):
+        """Keep the events of a session that is active again; sweep when it is time to"""
+        now = time.monotonic()
+        with self._retention_lock:
+            self._drop_at.pop(session_id, None)
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + self.SWEEP_SECONDS
+            due = [finished for finished, drop_at in self._drop_at.items() if drop_at <= now]
+            for finished in due:
+                del self._drop_at[finished]
+        for finished in due:
+            self.clear(finished)
+        if self.max_age_seconds:
+            self._drop_older_than(time.time() - self.max_age_seconds)
+
+    @abstractmethod
+    def clear(self, session_id: str):
+        """Drop the stored events of a session"""
+
+    @abstractmethod
+    def _drop_older_than(self, timestamp: float):
+        """Drop the events published before timestamp (seconds since the epoch)"""
+
+
+class ProgressEventLog(_EventRetention):
+    def __init__(self, max_events_per_session: int = 1000, retention_seconds: float = 300,
+                 max_age_seconds: Optional[float] = 24 * 3600):
+        super().__init__(retention_seconds, max_age_seconds)
+        self.max_events_per_session = max_events_per_session
+        self._events: Dict[str, Deque[Dict[str, Any]]] = defaultdict(
+            lambda: deque(maxlen=self.max_events_per_session)
+        )
+        # Ids come from one process-wide counter: increasing per session, also after a
+        # session's events were dropped, without keeping a counter per session
+        self._next_id = 0
+        self._subscribers: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, session_id: str, event_type: str, data: Optional[Dict[str, Any]] = None) -> int:
+        """Append an event for a session and wake up its subscribers. Safe to call from any thread."""
+        with self._lock:
+            self._next_id += 1
+            event_id = self._next_id
+            self._events[session_id].append({
+                "id": event_id,
+                "type": event_type,
+                "data": data or {},
+                "timestamp": time.time(),
+            })
+            subscribers = list(self._subscribers.get(session_id, ()))
+        for loop, wakeup in subscribers:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                # The subscriber's loop has been closed
+                pass
+        self._published(session_id)
+        return event_id
+
+    def events_since(self, session_id: str, after_id: int = 0) -> List[Dict[str, Any]]:
+        """Events with an id greater than after_id, oldest first"""
+        with self._lock:
+            return [event for event in self._events.get(session_id, ()) if event["id"] > after_id]
+
+    def last_id(self, session_id: str) -> int:
+        with self._lock:
+            events = self._events.get(session_id)
+            return events[-1]["id"] if events else 0
+
+    def subscribe(self, session_id: str) -> asyncio.Event:
+        """Register the running event loop for wake-ups on new session events"""
+        wakeup = asyncio.Event()
+        with self._lock:
+            self._subscribers[session_id].add((asyncio.get_running_loop(), wakeup))
+        return wakeup
+
+    def unsubscribe(self, session_id: str, wakeup: asyncio.Event):
+        with self._lock:
+            subscribers = self._subscribers.get(session_id)
+            if subscribers is None:
+                return
+            subscribers.difference_update({entry for entry in subscribers if entry[1] is wakeup})
+            if not subscribers:
+                del self._subscribers[session_id]
+
+    def clear(self, session_id: str):
+        """Drop the stored events of a session"""
+        self._unschedule(session_id)
+        with self._lock:
+            self._events.pop(session_id, None)
+
+    def _drop_older_than(self, timestamp: float):
+        with self._lock:
+            stale = [session_id for session_id, events in self._events.items()
+                     if not events or events[-1]["timestamp"] < timestamp]
+            for session_id in stale:
+                del self._events[session_id]
+
+
+class SQLiteProgressEventLog(_EventRetention):
+    """
+    ProgressEventLog shared by every worker process through a SQLite table.
+
+    A job running on one worker publishes events that clients connected to any other
+    worker receive. Subscribers are woken right away for events published in their own
+    process, and within poll_seconds for events published by other processes.
+    """
+
+    def __init__(self, path: str = "sessions.db", max_events_per_session: int = 1000, poll_seconds: float = 0.5,
+                 retention_seconds: float = 300, max_age_seconds: Optional[float] = 24 * 3600):
+        super().__init__(retention_seconds, max_age_seconds)
+        self.path = path
+        self.max_events_per_session = max_events_per_session
+        self.poll_seconds = poll_seconds
+        self._connections = ThreadLocalConnections(path)
+        self._subscribers: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = defaultdict(set)
+        # last event id subscribers were woken for, per subscribed session
+        self._notified_id: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._poller: Optional[threading.Thread] = None
+        self._connection().executescript("""
+            CREATE TABLE IF NOT EXISTS progress_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                type TEXT NOT NULL,
+                data TEXT NOT NULL,
+                timestamp REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_progress_events_session ON progress_events (session_id, id);
+            CREATE INDEX IF NOT EXISTS idx_progress_events_timestamp ON progress_events (timestamp);
+        """)
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def publish(self, session_id: str, event_type: str, data: Optional[Dict[str, Any]] = None) -> int:
+        """Append an event for a session and wake up its subscribers. Safe to call from any thread."""
+        conn = self._connection()
+        event_id = conn.execute(
+            "INSERT INTO progress_events (session_id, type, data, timestamp) VALUES (?, ?, ?, ?)",
+            (session_id, event_type, json.dumps(data or {}, default=str), time.time()),
+        ).lastrowid
+        if event_id % 100 == 0:
+            # Trim now and then rather than on every publish
+            conn.execute(
+                """DELETE FROM progress_events WHERE session_id = ? AND id <= (
+                       SELECT id FROM progress_events WHERE session_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)""",
+                (session_id, session_id, self.max_events_per_session),
+            )
+        self._wake(session_id, event_id)
+        self._published(session_id)
+        return event_id
+
+    def events_since(self, session_id: str, after_id: int = 0) -> List[Dict[str, Any]]:
+        """Events with an id greater than after_id, oldest first"""
+        rows = self._connection().execute(
+            "SELECT id, type, data, timestamp FROM progress_events WHERE session_id = ? AND id > ? ORDER BY id",
+            (session_id, after_id),
+        ).fetchall()
+        return [{"id": row[0], "type": row[1], "data": json.loads(row[2]), "timestamp": row[3]} for row in rows]
+
+    def last_id(self, session_id: str) -> int:
+        row = self._connection().execute(
+            "SELECT MAX(id) FROM progress_events WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0] or 0
+
+    def subscribe(self, session_id: str) -> asyncio.Event:
+        """Register the running event loop for wake-ups on new session events"""
+        wakeup = asyncio.Event()
+        last_id = self.last_id(session_id)
+        with self._lock:
+            self._subscribers[session_id].add((asyncio.get_running_loop(), wakeup))
+            self._notified_id.setdefault(session_id, last_id)
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll, name="progress-events-poller", daemon=True)
+                self._poller.start()
+        return wakeup
+
+    def unsubscribe(self, session_id: str, wakeup: asyncio.Event):
+        with self._lock:
+            subscribers = self._subscribers.get(session_id)
+            if subscribers is None:
+                return
+            subscribers.difference_update({entry for entry in subscribers if entry[1] is wakeup})
+            if not subscribers:
+                del self._subscribers[session_id]
+                self._notified_id.pop(session_id, None)
+
+    def clear(self, session_id: str):
+        """Drop the stored events of a session"""
+        self._unschedule(session_id)
+        self._connection().execute("DELETE FROM progress_events WHERE session_id = ?", (session_id,))
+
+    def _drop_older_than(self, timestamp: float):
+        self._connection().execute("DELETE FROM progress_events WHERE timestamp < ?", (timestamp,))
+
+    def _wake(self, session_id: str, event_id: int):
+        with self._lock:
+            if session_id not in self._subscribers:
+                return
+            self._notified_id[session_id] = max(event_id, self._notified_id.get(session_id, 0))
+            subscribers = list(self._subscribers[session_id])
+        for loop, wakeup in subscribers:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                # The subscriber's loop has been closed
+                pass
+
+    def _poll(self):
+        """Wake subscribers for events other processes published"""
+        while True:
+            time.sleep(self.poll_seconds)
+            with self._lock:
+                session_ids = list(self._subscribers)
+            if not session_ids:
+                continue
+            placeholders = ", ".join("?" for _ in session_ids)
+            try:
+                rows = self._connection().execute(
+                    f"SELECT session_id, MAX(id) FROM progress_events WHERE session_id IN ({placeholders}) "
+                    "GROUP BY session_id",
+                    session_ids,
+                ).fetchall()
+            except sqlite3.Error:
+                continue
+            for session_id, event_id in rows:
+                if event_id > self._notified_id.get(session_id, event_id):
+                    # published by another process
+                    self._wake(session_id, event_id)
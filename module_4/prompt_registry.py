@@ -0,0 +1,102 @@
+"""
+In-memory registry of the prompt templates in a prompt folder.
+
+Every graph node formats one of the markdown templates in prompt/ on each call. The
+registry reads and parses all of them once, so nodes format a template held in memory
+instead of searching for and reading the file each time. Edits to the folder are picked
+up while the process runs: at most every check_interval seconds the files' modification
+times are compared and changed, new or deleted templates are reloaded.
+"""
+import os
+import string
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+def find_prompt_dir(start: Path) -> Path:
+    """The nearest 'prompt' folder in start or one of its parents"""
+    for parent in [start, *start.parents]:
+        prompt_dir = parent / "prompt"
+        if prompt_dir.is_dir():
+            return prompt_dir
+    raise FileNotFoundError(f"No 'prompt' folder found upwards from {start}")
+
+
+class PromptTemplate:
+    """A prompt's text and the {placeholders} it expects"""
+
+    def __init__(self, name: str, text: str):
+        self.name = name
+        self.text = text
+        self.fields = frozenset(
+            field.split(".")[0].split("[")[0]
+            for _, field, _, _ in string.Formatter().parse(text) if field
+        )
+
+    def format(self, **kwargs) -> str:
+        if not self.fields and "{" not in self.text and "}" not in self.text:
+            return self.text
+        missing = self.fields - kwargs.keys()
+        if missing:
+            raise KeyError(f"Prompt '{self.name}' is missing values for {sorted(missing)}")
+        return self.text.format(**kwargs)
+
+    def __str__(self) -> str:
+        return self.text
+
+
+class PromptRegistry:
+    def __init__(self, prompt_dir: Path, check_interval: float = 2.0):
+        """
+        Args:
+            prompt_dir: folder with the <name>.md templates.
+            check_interval: seconds between checks for changed files; 0 checks on every
+                lookup, a negative value never reloads.
+        """
+        self.prompt_dir = Path(prompt_dir)
+        self.check_interval = check_interval
+        self._templates: Dict[str, PromptTemplate] = {}
+        # name -> (mtime_ns, size) of the file the template was loaded from
+        self._versions: Dict[str, Tuple[int, int]] = {}
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> int:
+        """Load new and changed templates and drop deleted ones; returns the number loaded"""
+        with self._lock:
+            versions = {}
+            for entry in os.scandir(self.prompt_dir):
+                if entry.is_file() and entry.name.endswith(".md"):
+                    stat = entry.stat()
+                    versions[entry.name[:-3]] = (stat.st_mtime_ns, stat.st_size)
+            loaded = 0
+            for name, version in versions.items():
+                if self._versions.get(name) != version:
+                    text = (self.prompt_dir / f"{name}.md").read_text(encoding="utf-8")
+                    self._templates[name] = PromptTemplate(name, text)
+                    loaded += 1
+            for name in self._versions.keys() - versions.keys():
+                self._templates.pop(name, None)
+            self._versions = versions
+            self._next_check = time.monotonic() + self.check_interval
+            return loaded
+
+    def get(self, name: str) -> PromptTemplate:
+        """The template <name>(.md); raises FileNotFoundError if there is none"""
+        if name.endswith(".md"):
+            name = name[:-3]
+        if self.check_interval >= 0 and time.monotonic() >= self._next_check:
+            self.reload()
+        template = self._templates.get(name)
+        if template is None:
+            raise FileNotFoundError(f"No prompt '{name}.md' in {self.prompt_dir}")
+        return template
+
+    def format(self, name: str, **kwargs) -> str:
+        return self.get(name).format(**kwargs)
+
+    def names(self) -> List[str]:
+        return sorted(self._templates)
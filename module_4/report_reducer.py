@@ -0,0 +1,148 @@
+"""
+Incremental, hierarchical reduce of interview sections.
+
+Sections are merged in groups of fan_in as soon as enough of them are available, while
+the remaining interviews are still running. Merged memos are merged again one level up,
+so by the time the last interview finishes only a few small merges (and the final report)
+are left, and no single LLM call ever sees more than fan_in memos.
+
+Interviews finish in any order, but the report follows the analysts' order: the sections of
+interview i are held back until those of every interview before it have been added, and
+each level merges only adjacent memos, so every memo covers a contiguous run of analysts
+and finish() returns the memos in analyst order.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+
+class _Level:
+    """Memos of one merge level, released in sequence order whatever order they arrive in"""
+
+    def __init__(self):
+        self.arrived: Dict[int, str] = {}
+        self.next_seq = 0
+        # released memos not merged yet, in order; the first has sequence number first_seq
+        self.ready: List[str] = []
+        self.first_seq = 0
+
+    def release(self):
+        while self.next_seq in self.arrived:
+            self.ready.append(self.arrived.pop(self.next_seq))
+            self.next_seq += 1
+
+
+class IncrementalSectionReducer:
+    def __init__(self, topic: str, merge_fn: Callable[[str, List[str]], str], fan_in: int = 4,
+                 expected_sections: Optional[int] = None, max_workers: int = 2,
+                 on_merge: Optional[Callable[[int, int], None]] = None):
+        """
+        Args:
+            topic: research topic passed to merge_fn.
+            merge_fn: merges a list of memos into one, e.g. assistant.merge_sections.
+            fan_in: number of memos merged per call (and the most left for the final report).
+            expected_sections: total sections that will be added. If it is <= fan_in nothing
+                is merged, since the final report can take them all directly.
+            max_workers: merges that may run at the same time.
+            on_merge: called with (level, group size) after each merge.
+        """
+        self.topic = topic
+        self.merge_fn = merge_fn
+        self.fan_in = max(2, fan_in)
+        self.eager = expected_sections is None or expected_sections > self.fan_in
+        self.on_merge = on_merge
+        # sections by interview index, until the interviews before them are added
+        self._interviews: Dict[int, List[str]] = {}
+        self._next_interview = 0
+        self._levels: Dict[int, _Level] = {}
+        self._pending = 0
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="section-merge")
+
+    def add(self, index: int, sections: List[str]):
+        """
+        Add the sections of interview `index` (0, 1, ... in report order); may start merges in
+        the background. Call it once per interview, with no sections for one that failed or
+        was cancelled, so the interviews after it are not held back.
+        """
+        with self._condition:
+            self._interviews[index] = list(sections)
+            while self._next_interview in self._interviews:
+                for section in self._interviews.pop(self._next_interview):
+                    level = self._level(0)
+                    level.arrived[level.next_seq] = section
+                    level.release()
+                self._next_interview += 1
+        self._merge_ready(0)
+
+    def finish(self) -> List[str]:
+        """Wait for running merges, merge what is left down to fan_in memos and return them"""
+        with self._condition:
+            while self._pending:
+                self._condition.wait()
+            # Interviews never added (e.g. not started before a deadline) hold back nothing now
+            leftover = [section for index in sorted(self._interviews) for section in self._interviews[index]]
+            self._interviews.clear()
+            # A higher level holds the merged memos of the earliest sections
+            memos = [memo for level in sorted(self._levels, reverse=True) for memo in self._levels[level].ready]
+            memos += leftover
+            self._levels.clear()
+        self._executor.shutdown(wait=True)
+        while len(memos) > self.fan_in:
+            memos = [self._merge_group(memos[i:i + self.fan_in]) for i in range(0, len(memos), self.fan_in)]
+        return memos
+
+    def close(self):
+        """Stop merging and drop merges that have not started yet (e.g. when the job is cancelled)"""
+        with self._condition:
+            self.eager = False
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _level(self, number: int) -> _Level:
+        level = self._levels.get(number)
+        if level is None:
+            level = self._levels[number] = _Level()
+        return level
+
+    def _merge_ready(self, number: int):
+        """Start merges of every fan_in adjacent memos released at a level"""
+        groups = []
+        with self._condition:
+            level = self._level(number)
+            while self.eager and len(level.ready) >= self.fan_in:
+                groups.append((level.first_seq // self.fan_in, level.ready[:self.fan_in]))
+                del level.ready[:self.fan_in]
+                level.first_seq += self.fan_in
+                self._pending += 1
+        for seq, group in groups:
+            try:
+                self._executor.submit(self._merge_into_next_level, number, seq, group)
+            except RuntimeError:
+                # Closed meanwhile; the group is not needed any more
+                with self._condition:
+                    self._pending -= 1
+                    self._condition.notify_all()
+
+    def _merge_into_next_level(self, number: int, seq: int, group: List[str]):
+        try:
+            merged = self._merge_group(group)
+            if self.on_merge:
+                self.on_merge(number + 1, len(group))
+            with self._condition:
+                level = self._level(number + 1)
+                level.arrived[seq] = merged
+                level.release()
+            self._merge_ready(number + 1)
+        finally:
+            with self._condition:
+                self._pending -= 1
+                self._condition.notify_all()
+
+    def _merge_group(self, group: List[str]) -> str:
+        if len(group) == 1:
+            return group[0]
+        try:
+            return self.merge_fn(self.topic, group)
+        except Exception:
+            # Losing content is worse than a longer prompt: keep the memos side by side
+            return "\n\n---\n\n".join(group)
@@ -0,0 +1,59 @@
+"""
+In-flight request coalescing with a short-lived result cache.
+
+Concurrent calls with the same key share one running computation instead of each
+paying for it; completed results are kept for ttl_seconds so calls arriving just
+after also reuse them. Meant for use on a single asyncio event loop (one per worker).
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+# How a result was obtained, returned alongside it
+COMPUTED, JOINED, CACHED = "computed", "joined", "cached"
+
+
+class RequestCoalescer:
+    def __init__(self, ttl_seconds: float = 300, max_entries: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._results: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, str]:
+        """
+        Return (result, source) for key, where source is COMPUTED, JOINED or CACHED.
+
+        factory is only called when no call with the same key is running and no fresh
+        cached result exists. Failures are not cached.
+        """
+        cached = self._results.get(key)
+        if cached is not None:
+            expires_at, result = cached
+            if expires_at > time.monotonic():
+                self._results.move_to_end(key)
+                return result, CACHED
+            del self._results[key]
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            # shield: a joined caller going away must not cancel the shared computation
+            return await asyncio.shield(task), JOINED
+
+        task = asyncio.ensure_future(factory())
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._on_done(key, done))
+        return await asyncio.shield(task), COMPUTED
+
+    def invalidate(self, key: Hashable):
+        self._results.pop(key, None)
+
+    def _on_done(self, key: Hashable, task: asyncio.Task):
+        self._in_flight.pop(key, None)
+        if task.cancelled() or task.exception() is not None or self.ttl_seconds <= 0:
+            return
+        self._results[key] = (time.monotonic() + self.ttl_seconds, task.result())
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
@@ -0,0 +1,161 @@
+"""
+Resource budgets for research sessions and tenants.
+
+A ResourceBudget caps the LLM calls, tokens, search requests and wall time a session may
+use. Budgets are enforced softly, inside the interview graph's nodes: once a limit is
+reached, pending questions, answers and searches are skipped and interviews end early
+with a section written from what they gathered, instead of failing the session.
+
+A session budget can have a tenant budget as its parent. Usage is recorded on both, so all
+sessions of a tenant share the tenant's limits. Tenant budgets cover a rolling window of
+window_seconds and start over in the next window.
+
+Graph nodes find their budget through the "budget_id" in the run config's configurable
+(see budget_from_config); usage of LLM calls is recorded by BudgetCallbackHandler.
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from llm_cache import is_cached
+
+RESOURCES = ("llm_calls", "tokens", "searches", "wall_seconds")
+
+# Limits that stop work needing a model call, and work that also needs a search
+LLM_RESOURCES = ("llm_calls", "tokens", "wall_seconds")
+SEARCH_RESOURCES = ("searches", *LLM_RESOURCES)
+
+
+def limits_from_env(prefix: str) -> Dict[str, Optional[float]]:
+    """
+    Limits from <prefix>_MAX_LLM_CALLS, _MAX_TOKENS, _MAX_SEARCHES and _MAX_WALL_SECONDS;
+    unset or 0 means unlimited.
+    """
+    return {resource: float(os.getenv(f"{prefix}_MAX_{resource.upper()}", "0")) or None for resource in RESOURCES}
+
+
+class ResourceBudget:
+    def __init__(self, limits: Optional[Dict[str, Optional[float]]] = None,
+                 parent: Optional["ResourceBudget"] = None):
+        """
+        Args:
+            limits: maximum per resource in RESOURCES; missing or None means unlimited.
+            parent: budget (e.g. of the tenant) that is charged for the same usage and
+                whose limits apply as well.
+        """
+        self.limits = {resource: (limits or {}).get(resource) for resource in RESOURCES}
+        self.parent = parent
+        self.started_at = time.monotonic()
+        self._used = {"llm_calls": 0, "tokens": 0, "searches": 0}
+        self._lock = threading.Lock()
+
+    def record_llm_call(self, tokens: int = 0):
+        with self._lock:
+            self._used["llm_calls"] += 1
+            self._used["tokens"] += tokens
+        if self.parent is not None:
+            self.parent.record_llm_call(tokens)
+
+    def record_search(self):
+        with self._lock:
+            self._used["searches"] += 1
+        if self.parent is not None:
+            self.parent.record_search()
+
+    def usage(self) -> Dict[str, float]:
+        with self._lock:
+            return {**self._used, "wall_seconds": round(time.monotonic() - self.started_at, 3)}
+
+    def exceeded(self, *resources: str) -> Optional[str]:
+        """
+        Name of the first of `resources` (default: all) whose limit is used up, here or in
+        the parent budget; None while all of them are within their limits.
+        """
+        usage = self.usage()
+        for resource in resources or RESOURCES:
+            limit = self.limits[resource]
+            if limit is not None and usage[resource] >= limit:
+                return resource
+        return self.parent.exceeded(*resources) if self.parent is not None else None
+
+
+class TenantBudgets:
+    """Budget of each tenant for the current window, shared by the tenant's sessions"""
+
+    def __init__(self, limits: Dict[str, Optional[float]], window_seconds: float = 3600):
+        # Wall time is limited per session only
+        self.limits = {**limits, "wall_seconds": None}
+        self.window_seconds = window_seconds
+        self._budgets: Dict[str, ResourceBudget] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return any(limit is not None for limit in self.limits.values())
+
+    def get(self, tenant: Optional[str]) -> Optional[ResourceBudget]:
+        """The tenant's budget, or None without a tenant or tenant limits"""
+        if not tenant or not self.enabled:
+            return None
+        with self._lock:
+            budget = self._budgets.get(tenant)
+            if budget is None or time.monotonic() - budget.started_at >= self.window_seconds:
+                budget = self._budgets[tenant] = ResourceBudget(self.limits)
+            return budget
+
+
+class BudgetCallbackHandler(BaseCallbackHandler):
+    """Records every LLM call of a run, with its token usage, on a budget"""
+
+    def __init__(self, budget: ResourceBudget):
+        self.budget = budget
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any):
+        if is_cached(response):
+            # Answered from the shared LLM cache: nothing reached the provider
+            return
+        tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                tokens += usage.get("total_tokens", 0)
+        if not tokens:
+            tokens = ((response.llm_output or {}).get("token_usage") or {}).get("total_tokens", 0)
+        self.budget.record_llm_call(tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self.budget.record_llm_call()
+
+
+# Budgets of running sessions by budget id, for the graph nodes of their interviews
+_active_budgets: Dict[str, ResourceBudget] = {}
+_registry_lock = threading.Lock()
+
+
+def register_budget(budget_id: str, budget: ResourceBudget):
+    with _registry_lock:
+        _active_budgets[budget_id] = budget
+
+
+def release_budget(budget_id: str):
+    with _registry_lock:
+        _active_budgets.pop(budget_id, None)
+
+
+def budget_from_config(config: Optional[Dict[str, Any]]) -> Optional[ResourceBudget]:
+    """Budget of the run, or None for runs without one (e.g. outside the API)"""
+    budget_id = ((config or {}).get("configurable") or {}).get("budget_id")
+    if budget_id is None:
+        return None
+    with _registry_lock:
+        return _active_budgets.get(budget_id)
+
+
+def budget_exceeded(config: Optional[Dict[str, Any]], *resources: str) -> Optional[str]:
+    """Exhausted limit of the run's budget among `resources`, or None"""
+    budget = budget_from_config(config)
+    return budget.exceeded(*resources) if budget is not None else None
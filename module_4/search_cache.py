@@ -0,0 +1,300 @@
+"""
+Search result cache shared by every interview in the process, or by every process.
+
+Analysts of one session, and sessions on related topics (e.g. the topics of one batch),
+often issue the same search queries. SearchCache keys results by source and normalized
+query, keeps them for ttl_seconds, and lets concurrent identical searches share a single
+request instead of each hitting Tavily or Wikipedia.
+
+SQLiteSearchCache keeps the results in a database file that every worker process (and
+the next process) shares. Documents are stored once, content-addressed by the hash of
+their content: results of different queries that return the same page point at the same
+row, and a page repeated within one result is kept once (by URL).
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from sqlite_connections import ThreadLocalConnections
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a search query"""
+    return " ".join((query or "").lower().split())
+
+
+class SearchCache:
+    def __init__(self, ttl_seconds: float = 3600, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._results: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._in_flight: Dict[Tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_search(self, source: str, query: str, search: Callable[[], Any]) -> Any:
+        """
+        Return the cached result of `query` on `source`, or call search() and cache its result.
+
+        Failures are not cached; callers waiting on a failing search get its exception.
+        """
+        if self.ttl_seconds <= 0:
+            return search()
+        key = (source, normalize_query(query))
+        found, result = self._lookup(key)
+        with self._lock:
+            if found:
+                self.hits += 1
+                return result
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+        if not owner:
+            return future.result()
+
+        try:
+            result = search()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            self._store(key, result)
+            return result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def _lookup(self, key: Tuple[str, str]) -> Tuple[bool, Any]:
+        """(True, result) for an unexpired cached result, else (False, None)"""
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                self._results.move_to_end(key)
+                return True, cached[1]
+        return False, None
+
+    def _store(self, key: Tuple[str, str], result: Any):
+        with self._lock:
+            self._results[key] = (time.monotonic() + self.ttl_seconds, result)
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._results), "hits": self.hits, "misses": self.misses,
+                    "ttl_seconds": self.ttl_seconds}
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+
+def _content_hash(body: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()
+
+
+def encode_result(result: Any) -> Tuple[str, Any, List[Tuple[str, str, str]]]:
+    """
+    Split a search result into (kind, the rest of the result, [(hash, url, body), ...]) with
+    one entry per document. Understands Tavily responses ({"results": [...]}) and lists of
+    Documents (WikipediaLoader); other JSON results are stored whole.
+    """
+    if isinstance(result, dict) and isinstance(result.get("results"), list):
+        kind, extra = "results", {k: v for k, v in result.items() if k != "results"}
+        bodies = [(doc.get("url") or "", doc) for doc in result["results"]]
+    elif isinstance(result, list) and all(isinstance(doc, Document) for doc in result):
+        kind, extra = "documents", None
+        bodies = [(doc.metadata.get("source") or "", {"page_content": doc.page_content, "metadata": doc.metadata})
+                  for doc in result]
+    else:
+        return "raw", result, []
+    documents, seen_urls = [], set()
+    for url, body in bodies:
+        if url and url in seen_urls:
+            continue
+        seen_urls.add(url)
+        documents.append((_content_hash(body), url, json.dumps(body)))
+    return kind, extra, documents
+
+
+def decode_result(kind: str, extra: Any, bodies: List[str]) -> Any:
+    documents = [json.loads(body) for body in bodies]
+    if kind == "results":
+        return {**extra, "results": documents}
+    if kind == "documents":
+        return [Document(page_content=doc["page_content"], metadata=doc["metadata"]) for doc in documents]
+    return extra
+
+
+class SQLiteSearchCache(SearchCache):
+    """
+    SearchCache in an SQLite database shared by processes. Concurrent identical searches
+    are merged within a process; across processes the first stored result wins for later
+    lookups.
+    """
+
+    # Expired results and unreferenced documents are purged every this many stores
+    PURGE_EVERY = 100
+
+    def __init__(self, path: str = "search_cache.db", ttl_seconds: float = 3600, max_entries: int = 100000):
+        super().__init__(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        self.path = path
+        self._connections = ThreadLocalConnections(path, pragmas=("journal_mode=WAL", "synchronous=NORMAL"))
+        self._stores = 0
+        self._connection().executescript("""
+            CREATE TABLE IF NOT EXISTS search_results (
+                source TEXT NOT NULL,
+                query TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                extra TEXT,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (source, query)
+            );
+            CREATE INDEX IF NOT EXISTS idx_search_results_expires ON search_results (expires_at);
+            CREATE TABLE IF NOT EXISTS search_result_documents (
+                source TEXT NOT NULL,
+                query TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                doc_hash TEXT NOT NULL,
+                PRIMARY KEY (source, query, position)
+            );
+            CREATE INDEX IF NOT EXISTS idx_search_result_documents_hash ON search_result_documents (doc_hash);
+            CREATE TABLE IF NOT EXISTS search_documents (
+                doc_hash TEXT PRIMARY KEY,
+                url TEXT,
+                body TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_search_documents_url ON search_documents (url);
+        """)
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def _lookup(self, key: Tuple[str, str]) -> Tuple[bool, Any]:
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT kind, extra FROM search_results WHERE source = ? AND query = ? AND expires_at > ?",
+            (*key, time.time()),
+        ).fetchone()
+        if row is None:
+            return False, None
+        bodies = [body for (body,) in conn.execute(
+            """SELECT d.body FROM search_result_documents r JOIN search_documents d ON d.doc_hash = r.doc_hash
+               WHERE r.source = ? AND r.query = ? ORDER BY r.position""",
+            key,
+        )]
+        return True, decode_result(row[0], json.loads(row[1]), bodies)
+
+    def _store(self, key: Tuple[str, str], result: Any):
+        try:
+            kind, extra, documents = encode_result(result)
+            extra_json = json.dumps(extra)
+        except (TypeError, ValueError):
+            # Not JSON-serializable; such results are simply not cached
+            return
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR IGNORE INTO search_documents (doc_hash, url, body, created_at) VALUES (?, ?, ?, ?)",
+                [(doc_hash, url, body, now) for doc_hash, url, body in documents],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO search_results (source, query, kind, extra, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (*key, kind, extra_json, now + self.ttl_seconds),
+            )
+            conn.execute("DELETE FROM search_result_documents WHERE source = ? AND query = ?", key)
+            conn.executemany(
+                "INSERT INTO search_result_documents (source, query, position, doc_hash) VALUES (?, ?, ?, ?)",
+                [(*key, position, doc_hash) for position, (doc_hash, _, _) in enumerate(documents)],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        with self._lock:
+            self._stores += 1
+            purge = self._stores % self.PURGE_EVERY == 0
+        if purge:
+            self.purge()
+
+    def purge(self):
+        """Drop expired results, the oldest results beyond max_entries, and documents no result uses"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                """DELETE FROM search_results WHERE expires_at <= ? OR rowid IN (
+                       SELECT rowid FROM search_results ORDER BY expires_at DESC LIMIT -1 OFFSET ?)""",
+                (time.time(), self.max_entries),
+            )
+            conn.execute(
+                """DELETE FROM search_result_documents WHERE NOT EXISTS (
+                       SELECT 1 FROM search_results s
+                       WHERE s.source = search_result_documents.source AND s.query = search_result_documents.query)"""
+            )
+            conn.execute(
+                """DELETE FROM search_documents WHERE NOT EXISTS (
+                       SELECT 1 FROM search_result_documents r WHERE r.doc_hash = search_documents.doc_hash)"""
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connection()
+        entries = conn.execute("SELECT COUNT(*) FROM search_results WHERE expires_at > ?", (time.time(),)).fetchone()[0]
+        documents = conn.execute("SELECT COUNT(*) FROM search_documents").fetchone()[0]
+        with self._lock:
+            return {"entries": entries, "documents": documents, "hits": self.hits, "misses": self.misses,
+                    "ttl_seconds": self.ttl_seconds}
+
+    def clear(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for table in ("search_results", "search_result_documents", "search_documents"):
+                conn.execute(f"DELETE FROM {table}")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def create_search_cache(kind: Optional[str] = None) -> SearchCache:
+    """
+    Build the search cache selected by SEARCH_CACHE.
+
+    Environment variables:
+        SEARCH_CACHE: "memory" or "sqlite" (default: "sqlite" with SESSION_STORE=sqlite, else "memory")
+        SEARCH_CACHE_DB_PATH: SQLite database file (default "search_cache.db")
+        SEARCH_CACHE_TTL_SECONDS: seconds a result is reused (default 3600, 0 disables the cache)
+        SEARCH_CACHE_MAX_ENTRIES: cached queries kept (default 1024 in memory, 100000 in SQLite)
+    """
+    default_kind = "sqlite" if os.getenv("SESSION_STORE", "memory").lower() == "sqlite" else "memory"
+    kind = (kind or os.getenv("SEARCH_CACHE", default_kind)).lower()
+    ttl_seconds = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "3600"))
+    if kind == "sqlite":
+        return SQLiteSearchCache(os.getenv("SEARCH_CACHE_DB_PATH", "search_cache.db"), ttl_seconds=ttl_seconds,
+                                 max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "100000")))
+    if kind == "memory":
+        return SearchCache(ttl_seconds=ttl_seconds, max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1024")))
+    raise ValueError(f"Unknown SEARCH_CACHE: {kind}")
@@ -0,0 +1,303 @@
+"""
+Pluggable session stores for the research API.
+
+Sessions are plain JSON-serializable dicts. Stores expose the same small interface:
+
+    store.create(session_id, session)
+    store.get(session_id)                 -> session dict or None
+    store.update(session_id, mutator)     -> atomic read-modify-write, returns mutator's result
+    store.delete(session_id)
+    store.list(status=..., limit=..., offset=..., created_after=..., created_before=...)
+
+Two implementations are provided:
+
+- InMemorySessionStore: process-local, bounded with LRU eviction and a TTL.
+- SQLiteSessionStore: durable, shareable between worker processes, with indexes on
+  status and created_at so listing sessions is an indexed query instead of a full scan.
+
+Pick one with create_session_store() (SESSION_STORE=memory|sqlite).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlite_connections import ThreadLocalConnections
+
+# Sessions in these states have a background job writing to them (or waiting to resume) and are never evicted
+ACTIVE_STATUSES = ("queued", "conducting_interviews", "interrupted")
+
+
+def session_summary(session_id: str, session: Dict[str, Any]) -> Dict[str, Any]:
+    """The fields returned when listing sessions"""
+    return {
+        "session_id": session_id,
+        "topic": session.get("topic"),
+        "status": session.get("status"),
+        "created_at": session.get("created_at"),
+        "analysts_count": len(session.get("analysts", [])),
+    }
+
+
+class SessionStore(ABC):
+    @abstractmethod
+    def create(self, session_id: str, session: Dict[str, Any]):
+        """Insert a new session"""
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return a session, or None if it does not exist (or has expired).
+
+        Treat the result as read-only; use update() to change a session.
+        """
+
+    @abstractmethod
+    def update(self, session_id: str, mutator: Callable[[Dict[str, Any]], Any]) -> Any:
+        """
+        Atomically apply mutator to a session, persist it and return the mutator's result.
+
+        Raises:
+            KeyError: if the session does not exist.
+        """
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        """Remove a session if it exists"""
+
+    @abstractmethod
+    def list(self, status: Optional[str] = None, limit: int = 50, offset: int = 0,
+             created_after: Optional[str] = None,
+             created_before: Optional[str] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """Return one page of session summaries (newest first) and the total matching count"""
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Process-local store bounded by max_sessions (least recently used evicted first)
+    and ttl_seconds since last access. Sessions with an active job are never evicted.
+    on_remove(session_id) is called for every session evicted or deleted.
+    """
+
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: Optional[float] = 24 * 3600,
+                 on_remove: Optional[Callable[[str], Any]] = None):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.on_remove = on_remove
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._last_access: Dict[str, float] = {}
+        self._lock = threading.RLock()
+
+    def create(self, session_id: str, session: Dict[str, Any]):
+        with self._lock:
+            self._sessions[session_id] = session
+            self._touch(session_id)
+            self._evict()
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if self._expired(session_id):
+                self._remove(session_id)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._touch(session_id)
+            return session
+
+    def update(self, session_id: str, mutator: Callable[[Dict[str, Any]], Any]) -> Any:
+        with self._lock:
+            session = self.get(session_id)
+            if session is None:
+                raise KeyError(session_id)
+            return mutator(session)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._remove(session_id)
+
+    def list(self, status: Optional[str] = None, limit: int = 50, offset: int = 0,
+             created_after: Optional[str] = None,
+             created_before: Optional[str] = None) -> Tuple[List[Dict[str, Any]], int]:
+        with self._lock:
+            self._evict()
+            matching = [
+                session_summary(session_id, session) for session_id, session in self._sessions.items()
+                if (status is None or session.get("status") == status)
+                and (created_after is None or session.get("created_at", "") > created_after)
+                and (created_before is None or session.get("created_at", "") < created_before)
+            ]
+        matching.sort(key=lambda summary: summary["created_at"] or "", reverse=True)
+        return matching[offset:offset + limit], len(matching)
+
+    def _touch(self, session_id: str):
+        self._sessions.move_to_end(session_id)
+        self._last_access[session_id] = time.monotonic()
+
+    def _expired(self, session_id: str) -> bool:
+        if self.ttl_seconds is None or session_id not in self._last_access:
+            return False
+        if self._sessions[session_id].get("status") in ACTIVE_STATUSES:
+            return False
+        return time.monotonic() - self._last_access[session_id] > self.ttl_seconds
+
+    def _remove(self, session_id: str):
+        removed = self._sessions.pop(session_id, None)
+        self._last_access.pop(session_id, None)
+        if removed is not None and self.on_remove is not None:
+            self.on_remove(session_id)
+
+    def _evict(self):
+        for session_id in [session_id for session_id in self._sessions if self._expired(session_id)]:
+            self._remove(session_id)
+        # LRU order: the first entries are the least recently used
+        overflow = len(self._sessions) - self.max_sessions
+        if overflow > 0:
+            evictable = [
+                session_id for session_id, session in self._sessions.items()
+                if session.get("status") not in ACTIVE_STATUSES
+            ]
+            for session_id in evictable[:overflow]:
+                self._remove(session_id)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite-backed store. The session body is kept as JSON next to indexed columns
+    (status, created_at) used for filtering and pagination. WAL mode lets several
+    processes share one database file; `table` lets other JSON records (e.g. batches)
+    use a table of their own in it.
+    """
+
+    def __init__(self, path: str = "sessions.db", ttl_seconds: Optional[float] = None, table: str = "sessions"):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.table = table
+        self._connections = ThreadLocalConnections(path, pragmas=("journal_mode=WAL", "synchronous=NORMAL"))
+        self._connection().executescript(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                session_id TEXT PRIMARY KEY,
+                topic TEXT,
+                status TEXT,
+                created_at TEXT,
+                updated_at REAL,
+                analysts_count INTEGER,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_{table}_status_created ON {table} (status, created_at);
+            CREATE INDEX IF NOT EXISTS idx_{table}_created ON {table} (created_at);
+        """)
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def _write(self, conn: sqlite3.Connection, session_id: str, session: Dict[str, Any]):
+        conn.execute(
+            f"""INSERT OR REPLACE INTO {self.table}
+               (session_id, topic, status, created_at, updated_at, analysts_count, data)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (
+                session_id,
+                session.get("topic"),
+                session.get("status"),
+                session.get("created_at"),
+                time.time(),
+                len(session.get("analysts", [])),
+                json.dumps(session, default=str),
+            ),
+        )
+
+    def create(self, session_id: str, session: Dict[str, Any]):
+        conn = self._connection()
+        self._write(conn, session_id, session)
+        self.purge_expired()
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            f"SELECT data FROM {self.table} WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, session_id: str, mutator: Callable[[Dict[str, Any]], Any]) -> Any:
+        conn = self._connection()
+        # BEGIN IMMEDIATE takes the write lock up front so concurrent updates serialize
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(f"SELECT data FROM {self.table} WHERE session_id = ?", (session_id,)).fetchone()
+            if row is None:
+                raise KeyError(session_id)
+            session = json.loads(row[0])
+            result = mutator(session)
+            self._write(conn, session_id, session)
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, session_id: str):
+        self._connection().execute(f"DELETE FROM {self.table} WHERE session_id = ?", (session_id,))
+
+    def list(self, status: Optional[str] = None, limit: int = 50, offset: int = 0,
+             created_after: Optional[str] = None,
+             created_before: Optional[str] = None) -> Tuple[List[Dict[str, Any]], int]:
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if created_after is not None:
+            clauses.append("created_at > ?")
+            params.append(created_after)
+        if created_before is not None:
+            clauses.append("created_at < ?")
+            params.append(created_before)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        conn = self._connection()
+        total = conn.execute(f"SELECT COUNT(*) FROM {self.table} {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"""SELECT session_id, topic, status, created_at, analysts_count FROM {self.table} {where}
+                ORDER BY created_at DESC LIMIT ? OFFSET ?""",
+            [*params, limit, offset],
+        ).fetchall()
+        return [
+            {"session_id": row[0], "topic": row[1], "status": row[2], "created_at": row[3], "analysts_count": row[4]}
+            for row in rows
+        ], total
+
+    def purge_expired(self):
+        """Delete inactive sessions not updated within ttl_seconds"""
+        if self.ttl_seconds is None:
+            return
+        placeholders = ", ".join("?" for _ in ACTIVE_STATUSES)
+        self._connection().execute(
+            f"DELETE FROM {self.table} WHERE updated_at < ? AND status NOT IN ({placeholders})",
+            (time.time() - self.ttl_seconds, *ACTIVE_STATUSES),
+        )
+
+
+def create_session_store(kind: Optional[str] = None, table: str = "sessions",
+                         on_remove: Optional[Callable[[str], Any]] = None) -> SessionStore:
+    """
+    Build the session store selected by SESSION_STORE (memory or sqlite). `table` is the
+    SQLite table to use; on_remove is called with the id of each session the in-memory
+    store evicts or deletes.
+
+    Environment variables:
+        SESSION_STORE: "memory" (default) or "sqlite"
+        SESSION_DB_PATH: SQLite database file (default "sessions.db")
+        SESSION_MAX: maximum sessions kept by the in-memory store (default 1000)
+        SESSION_TTL_SECONDS: seconds an inactive session is kept (default 86400, 0 disables)
+    """
+    kind = (kind or os.getenv("SESSION_STORE", "memory")).lower()
+    ttl_seconds = float(os.getenv("SESSION_TTL_SECONDS", str(24 * 3600))) or None
+    if kind == "sqlite":
+        return SQLiteSessionStore(os.getenv("SESSION_DB_PATH", "sessions.db"), ttl_seconds=ttl_seconds, table=table)
+    if kind == "memory":
+        return InMemorySessionStore(int(os.getenv("SESSION_MAX", "1000")), ttl_seconds=ttl_seconds,
+                                    on_remove=on_remove)
+    raise ValueError(f"Unknown SESSION_STORE: {kind}")
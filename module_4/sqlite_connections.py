@@ -0,0 +1,29 @@
+"""
+Per-thread SQLite connections for the stores that share a database file.
+
+sqlite3 connections are not shared between threads, so every store keeps one connection
+per thread. All of them run in autocommit mode (transactions are explicit BEGIN ...
+COMMIT) and in WAL mode, which lets several threads and worker processes read while one
+writes.
+"""
+import sqlite3
+import threading
+from typing import Sequence
+
+
+class ThreadLocalConnections:
+    def __init__(self, path: str, pragmas: Sequence[str] = ("journal_mode=WAL",), timeout: float = 30):
+        self.path = path
+        self.pragmas = tuple(pragmas)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            for pragma in self.pragmas:
+                conn.execute(f"PRAGMA {pragma}")
+            self._local.conn = conn
+        return conn
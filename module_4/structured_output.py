@@ -0,0 +1,33 @@
+"""
+Structured-output runnables built once per (model, schema) and reused.
+
+model.with_structured_output(Schema) converts the schema to a tool definition and wraps
+the model in a new runnable on every call. Graph nodes run for every analyst, turn and
+Send branch, so structured_output() keeps the runnable of each model/schema pair and hands
+out the same one afterwards. Runnables are stateless between invocations, so sharing one
+across threads is safe.
+"""
+import threading
+from typing import Any, Dict, Tuple
+
+_runnables: Dict[Tuple, Tuple[Any, Any]] = {}
+_lock = threading.Lock()
+
+
+def structured_output(model: Any, schema: Any, **kwargs: Any) -> Any:
+    """Cached model.with_structured_output(schema, **kwargs)"""
+    key = (id(model), schema, tuple(sorted(kwargs.items())))
+    entry = _runnables.get(key)
+    # The model is kept in the entry, so its id cannot be reused by another object meanwhile;
+    # replacing a module's model (e.g. with a fake) simply creates a new entry
+    if entry is not None and entry[0] is model:
+        return entry[1]
+    runnable = model.with_structured_output(schema, **kwargs)
+    with _lock:
+        _runnables[key] = (model, runnable)
+    return runnable
+
+
+def clear_structured_output_cache():
+    with _lock:
+        _runnables.clear()